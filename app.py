@@ -3,11 +3,11 @@ import streamlit as st
 from pathlib import Path
 import sys
 import os
+import bisect
+from dataclasses import dataclass
 from datetime import datetime
 
 sys.path.insert(0, str(Path(__file__).parent / "src"))
-from dotenv import load_dotenv
-load_dotenv()
 
 st.set_page_config(
     page_title="UniHelp",
@@ -16,22 +16,49 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+
+@st.cache_resource(show_spinner=False)
+def load_env():
+    """Read .env once per process instead of on every rerun."""
+    from dotenv import load_dotenv
+    load_dotenv()
+    return True
+
+
+load_env()
+
+
+@dataclass(slots=True)
+class Student:
+    """Logged-in student profile kept in session state."""
+    name: str = ""
+    id: str = ""
+    year: str = "1ère année"
+    specialty: str = "Informatique"
+    gpa: float = 0.0
+    absences: int = 0
+    max_absences: int = 15
+    email: str = ""
+    phone: str = ""
+    eligible_bourse: bool = False
+    bourse_amount: str = "Non éligible"
+    stage_deadline: str = "2025-06-30"
+    stage_deadline_dt: datetime = datetime(2025, 6, 30)
+
+
+_EMAIL_TBL = str.maketrans(" ", ".")
+
 # Session state
 defaults = {
     'messages': [],
     'vector_store': None,
     'openai_client': None,
     'student_logged_in': False,
-    'student': {
-        "name": "", "id": "", "year": "1ère année", "specialty": "Informatique",
-        "gpa": 0.0, "absences": 0, "max_absences": 15,
-        "email": "", "phone": "",
-        "eligible_bourse": False, "stage_deadline": "2025-06-30"
-    }
+    'student': Student()
 }
-for key, val in defaults.items():
-    if key not in st.session_state:
-        st.session_state[key] = val
+if "_initialized" not in st.session_state:
+    st.session_state.update(defaults)
+    st.session_state._initialized = True
 
 
 @st.cache_resource
@@ -39,7 +66,8 @@ def get_qdrant_store():
     try:
         from src.qdrant_rest import QdrantRESTClient
         store = QdrantRESTClient()
-        if store.get_collection_info()["points_count"] == 0:
+        store.ensure_quantization()
+        if not store.has_points():
             from src.ingest import IngestionPipeline
             with st.spinner("Importation des documents..."):
                 IngestionPipeline().ingest_directory("docs/Data")
@@ -49,6 +77,30 @@ def get_qdrant_store():
         return None
 
 
+@st.cache_resource
+def get_chip_embeddings():
+    """Embed the chips that go through RAG in one call, shared by all sessions."""
+    store = get_qdrant_store()
+    texts = [chip for chip in CHIPS if chip not in CHIP_DISPATCH]
+    if not store or not texts:
+        return {}
+    try:
+        return dict(zip(texts, store.embed(texts)))
+    except Exception as e:
+        print(f"Chip embedding prefetch failed: {e}")
+        return {}
+
+
+@st.cache_data(ttl=300, max_entries=256, show_spinner=False)
+def cached_search(query: str, limit: int = 3):
+    """Search shared across sessions so repeated questions skip embedding and Qdrant."""
+    store = get_qdrant_store()
+    chip_vector = get_chip_embeddings().get(query)
+    if chip_vector:
+        return store.search_by_vector(chip_vector, limit=limit, preview=True)
+    return store.search(query, limit=limit, preview=True)
+
+
 @st.cache_resource
 def get_openai_client():
     from openai import OpenAI
@@ -56,6 +108,56 @@ def get_openai_client():
     return OpenAI(api_key=key) if key else None
 
 
+# Status tiers: thresholds are sorted, each tier is (emoji, background[, status])
+_ABSENCE_TIER_KEYS = (50, 75)
+_ABSENCE_TIERS = (
+    ("✅", "#dcfce7", "Tout va bien!"),
+    ("⚠️", "#fef3c7", "Attention!"),
+    ("🚨", "#fee2e2", "Alerte!"),
+)
+_STAGE_TIER_KEYS = (30, 60)
+_STAGE_TIERS = (
+    ("🚨", "#fee2e2"),
+    ("⚠️", "#fef3c7"),
+    ("📅", "#dcfce7"),
+)
+
+_ABSENCE_CARD = """
+    <div style='background: {bg}; padding: 1.5rem; border-radius: 1rem; color: #000;'>
+        <h3>{emoji} Vos Absences</h3>
+        <p><strong>{status}</strong> {pct:.0f}% utilisé</p>
+        <div style='display: flex; gap: 2rem;'>
+            <span>Utilisées: <strong>{absences}/15</strong></span>
+            <span>Restantes: <strong>{remaining}</strong></span>
+        </div>
+    </div>
+    """
+_STAGE_CARD = """
+    <div style='background: {bg}; padding: 1.5rem; border-radius: 1rem; color: #000;'>
+        <h3>{emoji} Deadline Stage</h3>
+        <p><strong>{days} jours</strong> restants jusqu'au {deadline}</p>
+    </div>
+    """
+
+CHIPS = [
+    "📝 Comment s'inscrire ?", "📜 Demander une attestation",
+    "📅 Calendrier des examens", "💰 Montant des bourses",
+    "⚠️ Mes absences", "💼 Stage deadline"
+]
+
+# Kept identical for every student so OpenAI can reuse the cached prompt prefix
+RAG_SYSTEM_PROMPT = """Tu es UniHelp, l'assistant IA des services universitaires de l'Institut International de Technologie / NAU.
+
+Tu aides les étudiants sur l'inscription, les attestations, les bourses, les stages,
+les absences, le rattrapage, le paiement des frais et le calendrier académique.
+
+Utilise uniquement le contexte fourni. Si l'information n'y figure pas, dis-le poliment.
+Adresse-toi à l'étudiant par son nom. Réponds simplement et clairement. Pas de markdown."""
+
+_USER_TMPL = "<div style='text-align: right;'><span style='background: #e0e7ff; padding: 0.5rem 1rem; border-radius: 1rem; color: #000;'>{content}</span></div>"
+_ASSISTANT_TMPL = "<div style='background: #f9fafb; padding: 1rem; border-radius: 1rem; margin: 0.5rem 0; color: #000;'>{content}</div>"
+
+
 def show_login():
     """Login screen."""
     st.markdown("# 👋 Bienvenue sur UniHelp!")
@@ -65,32 +167,32 @@ def show_login():
         name = st.text_input("Nom complet", placeholder="Ex: Ahmed Ben Ali")
         student_id = st.text_input("Numéro étudiant", placeholder="Ex: 2024001")
 
-        col1, col2 = st.columns(2)
-        with col1:
+        c1, c2, c3, c4 = st.columns(4)
+        with c1:
             year = st.selectbox("Année", ["1ère année", "2ème année", "3ème année"])
-        with col2:
+        with c2:
             specialty = st.selectbox("Spécialité", ["Informatique", "Génie Logiciel", "IA & Data Science"])
-
-        col1, col2 = st.columns(2)
-        with col1:
+        with c3:
             gpa = st.slider("Moyenne", 0.0, 20.0, 12.0, 0.5)
-        with col2:
+        with c4:
             absences = st.number_input("Absences", 0, 15, 2)
 
         if st.form_submit_button("🚀 Commencer", type="primary"):
             if name and student_id:
-                st.session_state.student = {
-                    "name": name, "id": student_id,
-                    "email": f"{name.lower().replace(' ', '.')}@iit.tn",
-                    "phone": "+216 XX XXX XXX",
-                    "year": year, "specialty": specialty,
-                    "gpa": gpa, "absences": absences, "max_absences": 15,
-                    "eligible_bourse": gpa >= 14.0,
-                    "bourse_amount": "500 TND" if gpa >= 14 else "Non éligible",
-                    "stage_deadline": "2025-06-30"
-                }
+                st.session_state.student = Student(
+                    name=name, id=student_id,
+                    email=name.lower().translate(_EMAIL_TBL) + "@iit.tn",
+                    phone="+216 XX XXX XXX",
+                    year=year, specialty=specialty,
+                    gpa=gpa, absences=absences, max_absences=15,
+                    eligible_bourse=gpa >= 14.0,
+                    bourse_amount="500 TND" if gpa >= 14 else "Non éligible",
+                    stage_deadline="2025-06-30",
+                    stage_deadline_dt=datetime(2025, 6, 30)
+                )
                 st.session_state.student_logged_in = True
                 st.session_state.messages = []
+                get_chip_embeddings()
                 st.rerun()
 
 
@@ -100,68 +202,56 @@ def show_header():
     cols = st.columns([3, 1])
     with cols[0]:
         st.markdown(f"# 🎓 UniHelp")
-        st.caption(f"**{student['name']}** • {student['year']} • {student['specialty']}")
+        st.caption(f"**{student.name}** • {student.year} • {student.specialty}")
     with cols[1]:
         if st.button("⚙️ Paramètres"):
-            for key in ['student_logged_in', 'student', 'messages']:
+            for key in ['_initialized', 'student_logged_in', 'student', 'messages']:
                 if key in st.session_state:
                     del st.session_state[key]
             st.rerun()
 
 
-def show_chips():
+def show_chips(slot):
     """Show suggestion chips."""
     st.markdown("### 💡 Comment puis-je vous aider ?")
 
-    chips = [
-        "📝 Comment s'inscrire ?", "📜 Demander une attestation",
-        "📅 Calendrier des examens", "💰 Montant des bourses",
-        "⚠️ Mes absences", "💼 Stage deadline"
-    ]
-
     cols = st.columns(3)
-    for i, chip in enumerate(chips):
+    for i, chip in enumerate(CHIPS):
         with cols[i % 3]:
             if st.button(chip, key=f"chip_{i}", use_container_width=True):
                 st.session_state.messages.append({"role": "user", "content": chip})
-                process_action(chip)
+                process_action(chip, slot)
                 st.rerun()
 
 
-def process_action(query):
-    """Process query and add response."""
+def process_action(query, slot):
+    """Process query and render the response card into the result slot."""
     student = st.session_state.student
-    q = query.lower()
-
-    if "absence" in q:
-        handle_absences(student)
-    elif "attestation" in q:
-        handle_attestation(student)
-    elif "stage" in q:
-        handle_stage(student)
-    elif "bourse" in q:
-        handle_bourses(student)
-    else:
-        handle_rag(query, student)
+
+    # Exact chip clicks dispatch directly, free-form text scans keywords once
+    handler = CHIP_DISPATCH.get(query)
+    if handler is None:
+        q = query.lower()
+        handler = next((h for k, h in KEYWORD_HANDLERS if k in q), None)
+
+    # Cards replace the slot's previous content instead of appending new elements
+    with slot.container():
+        if handler:
+            handler(student)
+        else:
+            handle_rag(query, student)
 
 
 def handle_absences(s):
-    absences = s['absences']
+    absences = s.absences
     pct = (absences / 15) * 100
 
-    emoji = "✅" if pct < 50 else "⚠️" if pct < 75 else "🚨"
-    bg = "#dcfce7" if pct < 50 else "#fef3c7" if pct < 75 else "#fee2e2"
+    emoji, bg, status = _ABSENCE_TIERS[bisect.bisect_right(_ABSENCE_TIER_KEYS, pct)]
 
-    st.markdown(f"""
-    <div style='background: {bg}; padding: 1.5rem; border-radius: 1rem; color: #000;'>
-        <h3>{emoji} Vos Absences</h3>
-        <p><strong>{'Tout va bien!' if pct < 50 else 'Attention!' if pct < 75 else 'Alerte!'}</strong> {pct:.0f}% utilisé</p>
-        <div style='display: flex; gap: 2rem;'>
-            <span>Utilisées: <strong>{absences}/15</strong></span>
-            <span>Restantes: <strong>{15-absences}</strong></span>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_ABSENCE_CARD.format(
+        bg=bg, emoji=emoji, status=status, pct=pct,
+        absences=absences, remaining=15 - absences
+    ), unsafe_allow_html=True)
 
     st.session_state.messages.append({"role": "assistant", "content": f"Vos absences: {absences}/15 ({pct:.0f}%)"})
 
@@ -173,47 +263,42 @@ def handle_attestation(s):
 
 Madame, Monsieur,
 
-Je soussigné(e), {s['name']}, étudiant en {s['year']} - {s['specialty']},
-numéro {s['id']}, vous prie de m'établir une attestation de scolarité.
+Je soussigné(e), {s.name}, étudiant en {s.year} - {s.specialty},
+numéro {s.id}, vous prie de m'établir une attestation de scolarité.
 
 Cordialement,
-{s['name']}"""
+{s.name}"""
 
-    st.success(f"✅ Attestation générée pour {s['name']}")
+    st.success(f"✅ Attestation générée pour {s.name}")
     with st.expander("📧 Voir l'email"):
         st.code(email)
         if st.button("📋 Copier"):
             st.success("Copié!")
 
-    st.session_state.messages.append({"role": "assistant", "content": f"Attestation prête pour {s['name']}"})
+    st.session_state.messages.append({"role": "assistant", "content": f"Attestation prête pour {s.name}"})
     st.caption("📚 02_certificats.txt")
 
 
 def handle_stage(s):
-    deadline = datetime.strptime(s['stage_deadline'], "%Y-%m-%d")
-    days = (deadline - datetime.now()).days
+    days = (s.stage_deadline_dt - datetime.now()).days
 
-    emoji = "📅" if days > 60 else "⚠️" if days > 30 else "🚨"
-    bg = "#dcfce7" if days > 60 else "#fef3c7" if days > 30 else "#fee2e2"
+    emoji, bg = _STAGE_TIERS[bisect.bisect_left(_STAGE_TIER_KEYS, days)]
 
-    st.markdown(f"""
-    <div style='background: {bg}; padding: 1.5rem; border-radius: 1rem; color: #000;'>
-        <h3>{emoji} Deadline Stage</h3>
-        <p><strong>{days} jours</strong> restants jusqu'au {s['stage_deadline']}</p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_STAGE_CARD.format(
+        bg=bg, emoji=emoji, days=days, deadline=s.stage_deadline
+    ), unsafe_allow_html=True)
 
     st.session_state.messages.append({"role": "assistant", "content": f"Stage: {days} jours restants"})
     st.caption("📚 04_stages.txt")
 
 
 def handle_bourses(s):
-    if s['gpa'] >= 14:
-        st.success(f"🎉 Félicitations! Avec {s['gpa']}/20, vous êtes éligible à **500 TND/trimestre**")
+    if s.gpa >= 14:
+        st.success(f"🎉 Félicitations! Avec {s.gpa}/20, vous êtes éligible à **500 TND/trimestre**")
         st.session_state.messages.append({"role": "assistant", "content": f"Éligible bourse: 500 TND/trimestre"})
     else:
-        need = 14 - s['gpa']
-        st.info(f"💰 Votre moyenne: {s['gpa']}/20. Il vous manque {need:.1f} points pour la bourse.")
+        need = 14 - s.gpa
+        st.info(f"💰 Votre moyenne: {s.gpa}/20. Il vous manque {need:.1f} points pour la bourse.")
         st.session_state.messages.append({"role": "assistant", "content": f"Non éligible - Manque {need:.1f} points"})
     st.caption("📚 03_bourses.txt")
 
@@ -225,44 +310,71 @@ def handle_rag(query, student):
         st.error("Vector store non disponible")
         return
 
-    results = store.search(query, limit=3)
-    context = "\n".join([r["text"][:400] for r in results])
-    sources = list(set([r["metadata"].get("source", "") for r in results]))
+    # One pass over the results builds the context and the ordered sources
+    parts, sources = [], {}
+    for r in cached_search(query):
+        parts.append(r["text"])
+        sources[r["metadata"].get("source", "")] = None
+    context = "\n".join(parts)
+    sources = list(sources)
 
+    answer = None
     client = get_openai_client()
     if client:
         try:
-            resp = client.chat.completions.create(
+            stream = client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
-                    {"role": "system", "content": f"Réponds simplement et clairement à {student['name']}. Pas de markdown."},
-                    {"role": "user", "content": f"Contexte: {context}\nQuestion: {query}"}
+                    {"role": "system", "content": RAG_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"Étudiant: {student.name}\nContexte: {context}\nQuestion: {query}"}
                 ],
-                max_tokens=500
+                max_tokens=500,
+                stream=True
+            )
+            # Show tokens as they arrive instead of waiting for the full answer
+            answer = st.write_stream(
+                chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices
             )
-            answer = resp.choices[0].message.content
         except:
-            answer = context[:500]
-    else:
+            answer = None
+
+    if answer is None:
         answer = context[:500]
+        st.info(answer)
 
-    st.info(answer)
     st.session_state.messages.append({"role": "assistant", "content": answer})
     if sources:
         st.caption(f"📚 {', '.join(sources)}")
 
 
-def show_chat():
+# Routing tables (built once at import, chips without an action fall back to RAG)
+KEYWORD_HANDLERS = (
+    ("absence", handle_absences),
+    ("attestation", handle_attestation),
+    ("stage", handle_stage),
+    ("bourse", handle_bourses),
+)
+CHIP_DISPATCH = {
+    "📜 Demander une attestation": handle_attestation,
+    "💰 Montant des bourses": handle_bourses,
+    "⚠️ Mes absences": handle_absences,
+    "💼 Stage deadline": handle_stage,
+}
+
+
+def show_chat(slot):
     """Show chat history."""
-    for msg in st.session_state.messages:
-        if msg["role"] == "user":
-            st.markdown(f"<div style='text-align: right;'><span style='background: #e0e7ff; padding: 0.5rem 1rem; border-radius: 1rem; color: #000;'>{msg['content']}</span></div>", unsafe_allow_html=True)
-        else:
-            st.markdown(f"<div style='background: #f9fafb; padding: 1rem; border-radius: 1rem; margin: 0.5rem 0; color: #000;'>{msg['content']}</div>", unsafe_allow_html=True)
+    # One markdown element for the whole history instead of one per message
+    parts = [
+        (_USER_TMPL if msg["role"] == "user" else _ASSISTANT_TMPL).format(content=msg['content'])
+        for msg in st.session_state.messages
+    ]
+    if parts:
+        st.markdown("".join(parts), unsafe_allow_html=True)
 
     if prompt := st.chat_input("💬 Posez votre question..."):
         st.session_state.messages.append({"role": "user", "content": prompt})
-        process_action(prompt)
+        process_action(prompt, slot)
         st.rerun()
 
 
@@ -278,18 +390,19 @@ def main():
             st.session_state.openai_client = get_openai_client()
 
         show_header()
-        show_chips()
+        result_slot = st.empty()
+        show_chips(result_slot)
         st.markdown("---")
-        show_chat()
+        show_chat(result_slot)
 
     # Sidebar
     with st.sidebar:
         if st.session_state.student_logged_in:
             s = st.session_state.student
             st.markdown("### 👤 Profil")
-            st.metric("Nom", s['name'])
-            st.metric("Moyenne", f"{s['gpa']}/20")
-            st.metric("Absences", f"{s['absences']}/15")
+            st.metric("Nom", s.name)
+            st.metric("Moyenne", f"{s.gpa}/20")
+            st.metric("Absences", f"{s.absences}/15")
 
 
 if __name__ == "__main__":
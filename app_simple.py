@@ -3,8 +3,15 @@ import streamlit as st
 from pathlib import Path
 import sys
 import os
-from datetime import datetime, timedelta
+from datetime import date
 import json
+import re
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import MappingProxyType
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
@@ -21,8 +28,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS
-st.markdown("""
+# Custom CSS (st.html skips the markdown parser and adds no extra spacing)
+_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -168,19 +175,31 @@ st.markdown("""
         color: #000000 !important;
     }
 </style>
-""", unsafe_allow_html=True)
-
-
-# Default student data (overridden by user input)
-DEFAULT_STUDENT = {
-    "name": "",
-    "id": "",
-    "year": "1ère année",
-    "specialty": "Informatique",
-    "gpa": 0.0,
-    "absences": 0,
-    "max_absences": 15,
-}
+"""
+
+
+@dataclass(slots=True)
+class Student:
+    """Student profile, defaults are overridden by the welcome form."""
+    name: str = ""
+    id: str = ""
+    email: str = ""
+    phone: str = ""
+    year: str = "1ère année"
+    specialty: str = "Informatique"
+    gpa: float = 0.0
+    absences: int = 0
+    max_absences: int = 15
+    eligible_bourse: bool = False
+    bourse_amount: str = "Non éligible"
+    documents_requested: int = 0
+    documents_pending: int = 0
+    stage_status: str = "Non commencé"
+    stage_deadline: date = date(2025, 6, 30)
+
+# Chat history kept per session, and how many recent messages are drawn
+MAX_MESSAGES = 60
+VISIBLE_MESSAGES = 30
 
 # Suggestion chips with icons and colors
 SUGGESTION_CHIPS = [
@@ -194,6 +213,14 @@ SUGGESTION_CHIPS = [
     {"emoji": "🔄", "text": "Session de rattrapage", "gradient": "linear-gradient(135deg, #ff9a9e 0%, #fecfef 100%)"},
 ]
 
+_CHIP_LABELS = {chip["text"]: f"{chip['emoji']} {chip['text']}" for chip in SUGGESTION_CHIPS}
+
+# Per-chip colors, generated once; pills widgets carry a st-key-<key> class
+_CHIP_CSS = "<style>" + "".join(
+    f".st-key-chip_choice button:nth-of-type({i}){{background:{chip['gradient']};color:white;border:none}}"
+    for i, chip in enumerate(SUGGESTION_CHIPS, 1)
+) + "</style>"
+
 
 # Initialize Qdrant client
 @st.cache_resource
@@ -202,8 +229,8 @@ def get_qdrant_store():
     try:
         from src.qdrant_rest import QdrantRESTClient
         store = QdrantRESTClient()
-        info = store.get_collection_info()
-        if info["points_count"] == 0:
+        store.ensure_quantization()
+        if not store.has_points():
             from src.ingest import IngestionPipeline
             with st.spinner("Importation des documents..."):
                 pipeline = IngestionPipeline()
@@ -215,6 +242,70 @@ def get_qdrant_store():
         return None
 
 
+@st.cache_resource
+def get_semantic_cache():
+    """Qdrant collection caching generated answers by query embedding."""
+    try:
+        from src.qdrant_rest import QdrantRESTClient
+        from src.config import Config
+        return QdrantRESTClient(
+            collection_name=Config.SEMANTIC_CACHE_COLLECTION, indexed_fields=Config.CACHE_PAYLOAD_FIELDS
+        )
+    except Exception as e:
+        print(f"Semantic cache unavailable: {e}")
+        return None
+
+
+def lookup_cached_answer(cache, query_vector, student):
+    """Return a cached answer for a near-identical question, or None."""
+    from src.config import Config
+    try:
+        # Expired answers are filtered out by Qdrant, so they never shadow a fresh one
+        hits = cache.search_by_vector(
+            query_vector, limit=1,
+            filters={"specialty": student.specialty, "student_year": student.year},
+            ranges={"ts": {"gte": time.time() - Config.SEMANTIC_CACHE_TTL}}
+        )
+    except Exception as e:
+        print(f"Semantic cache lookup failed: {e}")
+        return None
+
+    if not hits or hits[0]["score"] < Config.SEMANTIC_CACHE_THRESHOLD:
+        return None
+    return hits[0]["metadata"]
+
+
+def cached_answer_id(query: str, student) -> str:
+    """Stable cache point id of a question, so refreshing an answer overwrites it."""
+    normalized = " ".join(query.lower().split())
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{student.specialty}|{student.year}|{normalized}"))
+
+
+@st.cache_resource
+def get_history_cache():
+    """On-disk store of chat histories, None when diskcache is not installed."""
+    try:
+        import diskcache
+        return diskcache.Cache("./.unihelp_cache", size_limit=2**30)
+    except Exception as e:
+        print(f"Chat history persistence disabled: {e}")
+        return None
+
+
+def load_history(student_id: str) -> deque:
+    """Load a student's saved chat history."""
+    cache = get_history_cache()
+    saved = cache.get(f"hist:{student_id}", []) if cache else []
+    return deque(saved, maxlen=MAX_MESSAGES)
+
+
+def save_history():
+    """Persist the current student's chat history for a day."""
+    cache = get_history_cache()
+    if cache:
+        cache.set(f"hist:{st.session_state.student.id}", list(st.session_state.messages), expire=86400)
+
+
 @st.cache_resource
 def get_openai_client():
     """Initialize OpenAI client."""
@@ -223,31 +314,44 @@ def get_openai_client():
     return OpenAI(api_key=api_key) if api_key else None
 
 
+def inject_css():
+    """Inject the app stylesheet.
+
+    Streamlit drops elements that a rerun does not emit again, so the
+    style block has to be sent on every run rather than once per session.
+    """
+    st.html(_CSS + _CHIP_CSS)
+
+
+# Session keys and the factories of their initial values. The shared
+# clients resolve once per session and handlers reuse these references.
+_SESSION_DEFAULTS = MappingProxyType({
+    'messages': lambda: deque(maxlen=MAX_MESSAGES),
+    'vector_store': get_qdrant_store,
+    'openai_client': get_openai_client,
+    'student_logged_in': lambda: False,
+    'student': Student,
+    'generated_actions': list,
+})
+
+
 def init_session_state():
-    """Initialize session state."""
-    defaults = {
-        'messages': [],
-        'vector_store': None,
-        'openai_client': None,
-        'student_logged_in': False,
-        'student': DEFAULT_STUDENT.copy(),
-        'generated_actions': []
-    }
-    for key, default in defaults.items():
+    """Initialize session state, building each default only when its key is missing."""
+    for key, factory in _SESSION_DEFAULTS.items():
         if key not in st.session_state:
-            st.session_state[key] = default
+            st.session_state[key] = factory()
 
 
 def display_header():
     """Display header."""
     if st.session_state.student_logged_in:
         student = st.session_state.student
-        st.markdown(f"""
+        st.html(f"""
     <div style='display: flex; justify-content: space-between; align-items: center;'>
         <div>
             <div style='font-size: 2rem; font-weight: bold; color: #000; margin: 0;'>🎓 UniHelp</div>
             <div style='font-size: 1rem; color: #333; margin: 0.25rem 0;'>
-                Bonjour, <strong style='color: #000;'>{student['name']}</strong> • {student['year']} • {student['specialty']}
+                Bonjour, <strong style='color: #000;'>{student.name}</strong> • {student.year} • {student.specialty}
             </div>
         </div>
         <div style='text-align: right;'>
@@ -256,22 +360,22 @@ def display_header():
             </span>
         </div>
     </div>
-    """, unsafe_allow_html=True)
+    """)
     else:
-        st.markdown("<div style='font-size: 2.5rem; font-weight: bold; color: #000; text-align: center;'>🎓 UniHelp</div>", unsafe_allow_html=True)
-        st.markdown("<div style='font-size: 1.2rem; color: #666; text-align: center;'>Assistant IA pour les services universitaires - IIT / NAU</div>", unsafe_allow_html=True)
+        st.html("<div style='font-size: 2.5rem; font-weight: bold; color: #000; text-align: center;'>🎓 UniHelp</div>")
+        st.html("<div style='font-size: 1.2rem; color: #666; text-align: center;'>Assistant IA pour les services universitaires - IIT / NAU</div>")
 
     st.markdown("---")
 
 
 def show_welcome_screen():
     """Show welcome/login screen."""
-    st.markdown("""
+    st.html("""
     <div class='welcome-section'>
         <h1 style='margin: 0;'>👋 Bienvenue sur UniHelp!</h1>
         <p style='font-size: 1.1rem; margin: 1rem 0;'>Votre assistant IA pour tous vos besoins universitaires</p>
     </div>
-    """, unsafe_allow_html=True)
+    """)
 
     col1, col2, col3 = st.columns([1, 1, 1])
 
@@ -294,26 +398,21 @@ def show_welcome_screen():
 
         if st.button("🚀 Commencer", type="primary", use_container_width=True):
             if name and student_id:
-                # Clear previous messages from other sessions
-                st.session_state.messages = []
-
-                st.session_state.student = {
-                    "name": name,
-                    "id": student_id,
-                    "email": f"{name.lower().replace(' ', '.')}@iit.tn",
-                    "phone": "+216 XX XXX XXX",
-                    "year": year,
-                    "specialty": specialty,
-                    "gpa": gpa,
-                    "absences": absences,
-                    "max_absences": 15,
-                    "eligible_bourse": gpa >= 14.0,
-                    "bourse_amount": "500 TND/trimestre" if gpa >= 14.0 else "Non éligible",
-                    "documents_requested": 0,
-                    "documents_pending": 0,
-                    "stage_status": "Non commencé",
-                    "stage_deadline": "2025-06-30",
-                }
+                # Resume this student's saved history, not another session's
+                st.session_state.messages = load_history(student_id)
+
+                st.session_state.student = Student(
+                    name=name,
+                    id=student_id,
+                    email=f"{name.lower().replace(' ', '.')}@iit.tn",
+                    phone="+216 XX XXX XXX",
+                    year=year,
+                    specialty=specialty,
+                    gpa=gpa,
+                    absences=absences,
+                    eligible_bourse=gpa >= 14.0,
+                    bourse_amount="500 TND/trimestre" if gpa >= 14.0 else "Non éligible",
+                )
                 st.session_state.student_logged_in = True
                 st.rerun()
             else:
@@ -329,21 +428,25 @@ def render_suggestion_chips():
 
     st.markdown("### 💡 Que puis-je vous aider ?")
 
-    cols = st.columns(4)
-    for i, chip in enumerate(SUGGESTION_CHIPS):
-        with cols[i % 4]:
-            if st.button(
-                f"{chip['emoji']} {chip['text']}",
-                key=f"chip_{chip['emoji']}",
-                use_container_width=True
-            ):
-                # Add user message
-                st.session_state.messages.append({"role": "user", "content": chip['text']})
+    # One pills widget instead of a button per chip
+    st.pills(
+        "Suggestions",
+        [chip["text"] for chip in SUGGESTION_CHIPS],
+        format_func=_CHIP_LABELS.get,
+        key="chip_choice",
+        on_change=on_chip_selected,
+        label_visibility="collapsed"
+    )
 
-                # Process the query and get response
-                process_query_and_respond(chip['text'])
 
-                st.rerun()
+def on_chip_selected():
+    """Answer the clicked chip, then clear the selection for the next click."""
+    text = st.session_state.chip_choice
+    if text:
+        st.session_state.messages.append({"role": "user", "content": text})
+        process_query_and_respond(text)
+        save_history()
+        st.session_state.chip_choice = None
 
 
 def process_query_and_respond(query: str):
@@ -358,66 +461,90 @@ def process_query_and_respond(query: str):
 
     student = st.session_state.student
 
-    # Detect action
-    query_lower = query.lower()
-    action = None
-
-    if "absence" in query_lower or "mes absences" in query_lower:
-        action = "absences"
-    elif "attestation" in query_lower or "certificat" in query_lower:
-        action = "attestation"
-    elif "stage" in query_lower:
-        action = "stage"
-    elif "bourse" in query_lower:
-        action = "bourses"
-    elif "inscription" in query_lower or "s'inscrire" in query_lower:
-        action = "inscription"
-    elif "calendrier" in query_lower or "examen" in query_lower:
-        action = "calendrier"
-    elif "paiement" in query_lower or "frais" in query_lower:
-        action = "paiement"
-    elif "rattrapage" in query_lower:
-        action = "rattrapage"
-
-    # Handle actions
-    if action == "absences":
-        handle_absences_action(student)
-        return
+    # Detect action in a single regex scan and dispatch the card handlers
+    action = detect_action(query)
 
-    if action == "attestation":
-        handle_attestation_action(student)
+    handler = _ACTION_HANDLERS.get(action)
+    if handler:
+        handler(student)
         return
 
-    if action == "stage":
-        handle_stage_action(student)
+    # FAQ chips get a canned answer, no Qdrant or OpenAI call
+    if action in _STATIC_ANSWERS and query in _CHIP_LABELS:
+        text, source = _STATIC_ANSWERS[action]
+        st.session_state.messages.append({"role": "assistant", "content": text, "sources": [source]})
         return
 
-    if action == "bourses":
-        handle_bourses_action(student)
-        return
+    # Semantic cache: reuse the answer of a near-identical question
+    cache = get_semantic_cache()
+    query_vector = None
+    if cache:
+        try:
+            query_vector = cache.embed([query])[0]
+        except Exception as e:
+            print(f"Query embedding failed: {e}")
+
+    store = st.session_state.vector_store
+    cached, results = None, None
+    if cache and query_vector is not None:
+        # Start the document search in the background while the cache is checked;
+        # on a hit the search is abandoned instead of waited for
+        executor = ThreadPoolExecutor(max_workers=1)
+        results_future = executor.submit(store.search_by_vector, query_vector, limit=3) if store else None
+        cached = lookup_cached_answer(cache, query_vector, student)
+        if results_future and not cached:
+            results = results_future.result()
+        executor.shutdown(wait=False, cancel_futures=True)
+        if cached:
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": cached["answer"],
+                "sources": cached.get("sources", [])
+            })
+            return
 
     # Regular RAG search
-    store = st.session_state.vector_store or get_qdrant_store()
     if store:
-        results = store.search(query, limit=3)
+        if results is None:
+            if query_vector is not None:
+                results = store.search_by_vector(query_vector, limit=3)
+            else:
+                results = store.search(query, limit=3)
         context = "\n\n".join([r["text"][:500] for r in results])
-        sources = list(set([r["metadata"].get("source", "Doc") for r in results]))
+        sources = list(dict.fromkeys(r["metadata"].get("source", "Doc") for r in results))
     else:
         context = ""
         sources = []
 
-    client = get_openai_client()
+    client = st.session_state.openai_client
     if client:
         try:
             response = client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
-                    {"role": "system", "content": f"Tu es UniHelp, assistant de l'IIT. L'étudiant est {student['name']}, en {student['year']}. Réponds de manière simple et claire, sans utiliser de markdown (pas de **, pas de ###)."},
+                    {"role": "system", "content": f"Tu es UniHelp, assistant de l'IIT. L'étudiant est en {student.year}. Réponds de manière simple et claire, sans utiliser de markdown (pas de **, pas de ###)."},
                     {"role": "user", "content": f"CONTEXTE:\n{context}\n\nQUESTION: {query}"}
                 ],
-                max_tokens=600
+                max_tokens=600,
+                stream=True
             )
-            answer = response.choices[0].message.content
+            # Tokens are shown as they arrive, the full text is kept for history
+            # The prompt leaves out the student's name, so answers can be shared
+            # through the semantic cache with students of the same specialty and year
+            answer = st.write_stream(
+                chunk.choices[0].delta.content or "" for chunk in response if chunk.choices
+            )
+            if cache and query_vector is not None:
+                try:
+                    cache.upsert_point(cached_answer_id(query, student), query_vector, {
+                        "answer": answer,
+                        "sources": sources,
+                        "ts": time.time(),
+                        "specialty": student.specialty,
+                        "student_year": student.year,
+                    })
+                except Exception as e:
+                    print(f"Semantic cache write failed: {e}")
         except:
             answer = context[:600] if context else "Service indisponible."
     else:
@@ -437,8 +564,8 @@ def process_query(query: str):
 
 def handle_absences_action(student):
     """Handle absences with dynamic countdown."""
-    absences = student['absences']
-    max_abs = student['max_absences']
+    absences = student.absences
+    max_abs = student.max_absences
     percentage = (absences / max_abs) * 100
     remaining = max_abs - absences
 
@@ -477,32 +604,31 @@ def handle_attestation_action(student):
 
 Madame, Monsieur,
 
-Je soussigné(e), {student['name']}, étudiant(e) en {student['year']} - {student['specialty']},
-numéro {student['id']}, vous prie de bien vouloir m'établir une attestation de scolarité
+Je soussigné(e), {student.name}, étudiant(e) en {student.year} - {student.specialty},
+numéro {student.id}, vous prie de bien vouloir m'établir une attestation de scolarité
 pour l'année universitaire 2024-2025.
 
 Je vous remercie par avance pour votre attention.
 
 Cordialement,
 
-{student['name']}
-Étudiant en {student['year']}
-Email: {student['email']}"""
+{student.name}
+Étudiant en {student.year}
+Email: {student.email}"""
 
     st.session_state.messages.append({
         "role": "assistant",
-        "content": f"Attestation prête pour {student['name']} • {student['id']}",
+        "content": f"Attestation prête pour {student.name} • {student.id}",
         "sources": ["02_certificats.txt"],
         "action": "attestation",
         "email": email_body,
-        "student_name": student['name']
+        "student_name": student.name
     })
 
 
 def handle_stage_action(student):
     """Handle stage deadline with countdown."""
-    deadline = datetime.strptime(student['stage_deadline'], "%Y-%m-%d")
-    days_left = (deadline - datetime.now()).days
+    days_left = (student.stage_deadline - date.today()).days
 
     if days_left > 60:
         emoji = "📅"
@@ -523,19 +649,19 @@ def handle_stage_action(student):
         "sources": ["04_stages.txt"],
         "action": "stage",
         "style": bg,
-        "data": {"deadline": student['stage_deadline'], "days_left": days_left}
+        "data": {"deadline": student.stage_deadline.isoformat(), "days_left": days_left}
     })
 
 
 def handle_bourses_action(student):
     """Handle bourses with eligibility."""
-    gpa = student['gpa']
+    gpa = student.gpa
     eligible = gpa >= 14.0
 
     if eligible:
         st.session_state.messages.append({
             "role": "assistant",
-            "content": f"Félicitations {student['name'].split()[0]}! Vous êtes éligible à la bourse au mérite (500 TND/trimestre) avec votre moyenne de {gpa}/20",
+            "content": f"Félicitations {student.name.split()[0]}! Vous êtes éligible à la bourse au mérite (500 TND/trimestre) avec votre moyenne de {gpa}/20",
             "sources": ["03_bourses.txt"],
             "action": "bourses",
             "eligible": True,
@@ -553,94 +679,171 @@ def handle_bourses_action(student):
         })
 
 
-def render_message(message, msg_index: int):
-    """Render a chat message with clean styling."""
-    if message["role"] == "user":
-        st.markdown(f"""
+# Query intents, tagged by named group; card actions map to their handler
+_ACTION_RE = re.compile(
+    r"(?P<absences>absence)"
+    r"|(?P<attestation>attestation|certificat)"
+    r"|(?P<stage>stage)"
+    r"|(?P<bourses>bourse)"
+    r"|(?P<inscription>inscription|s'inscrire)"
+    r"|(?P<calendrier>calendrier|examen)"
+    r"|(?P<paiement>paiement|frais)"
+    r"|(?P<rattrapage>rattrapage)",
+    re.IGNORECASE
+)
+_ACTION_HANDLERS = {
+    "absences": handle_absences_action,
+    "attestation": handle_attestation_action,
+    "stage": handle_stage_action,
+    "bourses": handle_bourses_action,
+}
+
+# Canned answers for the FAQ chips, with the document they summarize
+_STATIC_ANSWERS = {
+    "inscription": (
+        "📝 Pour vous inscrire ou vous réinscrire, préparez votre dossier (pièce d'identité, "
+        "diplôme ou relevé de notes de l'année précédente, photos) et déposez-le au service "
+        "de scolarité pendant la période d'inscription, après le paiement des frais.",
+        "01_inscription.txt"
+    ),
+    "calendrier": (
+        "📅 Les dates des examens, des sessions de rattrapage et des vacances sont fixées "
+        "dans le calendrier académique, affiché à la scolarité et publié en début d'année.",
+        "08_calendrier.txt"
+    ),
+    "paiement": (
+        "💳 Les frais d'inscription se règlent avant le dépôt du dossier, selon les modalités "
+        "indiquées par le service financier. Conservez votre reçu : il est demandé à l'inscription.",
+        "07_paiement.txt"
+    ),
+    "rattrapage": (
+        "🔄 La session de rattrapage concerne les modules non validés en session principale. "
+        "Consultez vos résultats puis le calendrier pour connaître les dates et les modalités.",
+        "06_rattrapage.txt"
+    ),
+}
+
+
+def detect_action(query: str):
+    """Return the intent tag of a query, or None for free-form questions."""
+    match = _ACTION_RE.search(query)
+    return match.lastgroup if match else None
+
+
+# HTML skeletons for chat messages, only the dynamic fields are substituted
+_USER_TPL = """
         <div style='text-align: right; margin: 1rem 0;'>
             <span style='background: #e0e7ff; padding: 0.75rem 1.5rem; border-radius: 2rem; display: inline-block; color: #000;'>
-                {message['content']}
+                {content}
             </span>
         </div>
-        """, unsafe_allow_html=True)
-        return
-
-    # Assistant messages
-    action = message.get("action")
-
-    if action == "absences":
-        data = message.get("data", {})
-        st.markdown(f"""
-        <div class='{message.get('style', 'countdown-success')}'>
-            <h3>{data.get('emoji', '📊')} Vos Absences</h3>
-            <p><strong>{message['content']}</strong></p>
+        """
+_ABSENCE_TPL = """
+        <div class='{style}'>
+            <h3>{emoji} Vos Absences</h3>
+            <p><strong>{content}</strong></p>
             <div style='display: grid; grid-template-columns: repeat(3, 1fr); gap: 1rem; margin-top: 1rem;'>
                 <div style='background: rgba(255,255,255,0.5); padding: 1rem; border-radius: 0.5rem; text-align: center;'>
-                    <div style='font-size: 1.5rem; font-weight: bold;'>{data.get('absences', '0/15')}</div>
+                    <div style='font-size: 1.5rem; font-weight: bold;'>{absences}</div>
                     <div style='font-size: 0.85rem;'>Utilisées</div>
                 </div>
                 <div style='background: rgba(255,255,255,0.5); padding: 1rem; border-radius: 0.5rem; text-align: center;'>
-                    <div style='font-size: 1.5rem; font-weight: bold;'>{data.get('percentage', '0%')}</div>
+                    <div style='font-size: 1.5rem; font-weight: bold;'>{percentage}</div>
                     <div style='font-size: 0.85rem;'>Pourcentage</div>
                 </div>
                 <div style='background: rgba(255,255,255,0.5); padding: 1rem; border-radius: 0.5rem; text-align: center;'>
-                    <div style='font-size: 1.5rem; font-weight: bold;'>{data.get('remaining', '0')}</div>
+                    <div style='font-size: 1.5rem; font-weight: bold;'>{remaining}</div>
                     <div style='font-size: 0.85rem;'>Restantes</div>
                 </div>
             </div>
             <p style='margin-top: 1rem; font-size: 0.9rem;'>Règle: Plus de 15% d'absences = élimination</p>
         </div>
-        """, unsafe_allow_html=True)
-
-    elif action == "attestation":
-        st.markdown(f"""
+        """
+_ATTESTATION_TPL = """
         <div class='action-card'>
             <h3>✅ Attestation Prête!</h3>
-            <p>J'ai généré votre demande pour: <strong>{message.get('student_name', 'Vous')}</strong></p>
+            <p>J'ai généré votre demande pour: <strong>{student_name}</strong></p>
         </div>
-        """, unsafe_allow_html=True)
-        with st.expander("📧 Voir l'email généré"):
-            st.code(message.get("email", ""), language="text")
-            copy_key = f"copy_{msg_index}_{hash(str(message)) % 10000}"
-            if st.button("📋 Copier l'email", key=copy_key):
-                st.success("✅ Email copié!")
-
-    elif action == "stage":
-        data = message.get("data", {})
-        st.markdown(f"""
-        <div class='{message.get('style', 'countdown-success')}'>
+        """
+_STAGE_TPL = """
+        <div class='{style}'>
             <h3>💼 Deadline Stage</h3>
-            <p><strong>Temps restant:</strong> {data.get('days_left', 0)} jours</p>
-            <p><strong>Date limite:</strong> {data.get('deadline', '2025-06-30')}</p>
+            <p><strong>Temps restant:</strong> {days_left} jours</p>
+            <p><strong>Date limite:</strong> {deadline}</p>
         </div>
-        """, unsafe_allow_html=True)
-
-    elif action == "bourses":
-        eligible = message.get("eligible", False)
-        gpa = message.get("gpa", 0)
-        bg = "countdown-success" if eligible else "countdown-warning"
-        if eligible:
-            st.markdown(f"""
-            <div class='{bg}'>
+        """
+_BOURSE_ELIGIBLE_TPL = """
+            <div class='countdown-success'>
                 <h3>🎉 Bourse au Mérite!</h3>
                 <p>Félicitations! Avec une moyenne de <strong>{gpa}/20</strong>, vous êtes éligible à <strong>500 TND/trimestre</strong></p>
             </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown(f"""
-            <div class='{bg}'>
+            """
+_BOURSE_TPL = """
+            <div class='countdown-warning'>
                 <h3>💰 Bourses</h3>
                 <p>Votre moyenne: <strong>{gpa}/20</strong>. Continuez vos efforts pour atteindre 14/20!</p>
             </div>
-            """, unsafe_allow_html=True)
+            """
+_SOURCES_TPL = "<div style='font-size: 0.875rem; color: #6b7280; margin-bottom: 0.5rem;'>📚 Source: {sources}</div>"
+_ASSISTANT_TPL = """
+        <div style='background: #f9fafb; padding: 1rem; border-radius: 1rem; margin: 0.5rem 0; border-left: 4px solid #22c55e; color: #000;'>
+            {content}
+        </div>
+        """
+
+
+def message_html(message) -> str:
+    """Build the HTML of a message that needs no interactive widget."""
+    if message["role"] == "user":
+        return _USER_TPL.format(content=message['content'])
+
+    # Assistant messages
+    action = message.get("action")
+
+    if action == "absences":
+        data = message.get("data", {})
+        html = _ABSENCE_TPL.format(
+            style=message.get('style', 'countdown-success'),
+            emoji=data.get('emoji', '📊'),
+            content=message['content'],
+            absences=data.get('absences', '0/15'),
+            percentage=data.get('percentage', '0%'),
+            remaining=data.get('remaining', '0')
+        )
+
+    elif action == "stage":
+        data = message.get("data", {})
+        html = _STAGE_TPL.format(
+            style=message.get('style', 'countdown-success'),
+            days_left=data.get('days_left', 0),
+            deadline=data.get('deadline', '2025-06-30')
+        )
+
+    elif action == "bourses":
+        template = _BOURSE_ELIGIBLE_TPL if message.get("eligible", False) else _BOURSE_TPL
+        html = template.format(gpa=message.get("gpa", 0))
 
     else:
         # Regular message - just plain text
-        st.markdown(f"""
-        <div style='background: #f9fafb; padding: 1rem; border-radius: 1rem; margin: 0.5rem 0; border-left: 4px solid #22c55e; color: #000;'>
-            {message['content']}
-        </div>
-        """, unsafe_allow_html=True)
+        html = _ASSISTANT_TPL.format(content=message['content'])
+
+    if message.get("sources"):
+        html += _SOURCES_TPL.format(sources=", ".join(message['sources']))
+    return html
+
+
+def render_message(message, msg_index: int):
+    """Render a chat message with clean styling."""
+    if message.get("action") != "attestation":
+        st.html(message_html(message))
+        return
+
+    st.html(_ATTESTATION_TPL.format(student_name=message.get('student_name', 'Vous')))
+    with st.expander("📧 Voir l'email généré"):
+        st.code(message.get("email", ""), language="text")
+        copy_key = f"copy_{msg_index}_{hash(str(message)) % 10000}"
+        if st.button("📋 Copier l'email", key=copy_key):
+            st.success("✅ Email copié!")
 
     # Sources
     if message.get("sources"):
@@ -648,6 +851,31 @@ def render_message(message, msg_index: int):
         st.caption(f"📚 Source: {sources}")
 
 
+def render_messages(messages, start: int = 0):
+    """Render messages, merging consecutive static ones into a single st.html call."""
+    buffer = []
+    for idx, message in enumerate(messages, start):
+        if message.get("action") == "attestation":
+            if buffer:
+                st.html("".join(buffer))
+                buffer = []
+            render_message(message, idx)
+        else:
+            buffer.append(message_html(message))
+    if buffer:
+        st.html("".join(buffer))
+
+
+@st.cache_data(ttl=60)
+def list_docs(data_dir: str = "docs/Data") -> list:
+    """First eight text documents by name, rescanned at most once a minute."""
+    try:
+        with os.scandir(data_dir) as entries:
+            return sorted(e.name for e in entries if e.name.endswith(".txt"))[:8]
+    except FileNotFoundError:
+        return []
+
+
 def sidebar():
     """Render sidebar."""
     with st.sidebar:
@@ -658,12 +886,12 @@ def sidebar():
             st.markdown("### 👤 Mon Profil")
 
             student = st.session_state.student
-            st.metric("Nom", student['name'])
-            st.metric("Année", student['year'])
-            st.metric("Moyenne", f"{student['gpa']}/20")
-            st.metric("Absences", f"{student['absences']}/15")
+            st.metric("Nom", student.name)
+            st.metric("Année", student.year)
+            st.metric("Moyenne", f"{student.gpa}/20")
+            st.metric("Absences", f"{student.absences}/15")
 
-            if student['gpa'] >= 14:
+            if student.gpa >= 14:
                 st.success("🏆 Éligible bourse")
             else:
                 st.info("💰 Non éligible bourse")
@@ -677,28 +905,30 @@ def sidebar():
 
         st.markdown("---")
         st.markdown("### 📚 Documents")
-        data_dir = Path("docs/Data")
-        if data_dir.exists():
-            for doc in sorted(data_dir.glob("*.txt"))[:8]:
-                st.text(f"📄 {doc.stem.replace('_', ' ').title()}")
+        for name in list_docs():
+            st.text(f"📄 {name[:-4].replace('_', ' ').title()}")
 
 
 def chat_interface():
     """Render chat interface."""
-    # Render all messages with index
-    for idx, message in enumerate(st.session_state.messages):
-        render_message(message, idx)
+    # Render only the latest messages, older ones on demand
+    messages = list(st.session_state.messages)
+    older = messages[:-VISIBLE_MESSAGES]
+    if older and st.toggle(f"Voir l'historique complet ({len(older)} messages)", key="show_full_history"):
+        render_messages(older)
+    render_messages(messages[-VISIBLE_MESSAGES:], len(older))
 
     # Chat input
     if prompt := st.chat_input("💬 Posez votre question..."):
         st.session_state.messages.append({"role": "user", "content": prompt})
-        with st.spinner("🤔"):
-            process_query(prompt)
+        process_query(prompt)
+        save_history()
         st.rerun()
 
 
 def main():
     """Main app."""
+    inject_css()
     init_session_state()
     display_header()
 
@@ -706,12 +936,6 @@ def main():
     if not st.session_state.student_logged_in:
         show_welcome_screen()
     else:
-        # Initialize services
-        if not st.session_state.vector_store:
-            st.session_state.vector_store = get_qdrant_store()
-        if not st.session_state.openai_client:
-            st.session_state.openai_client = get_openai_client()
-
         # Suggestion chips
         render_suggestion_chips()
 
@@ -725,9 +949,8 @@ def main():
 
     # Footer
     st.markdown("---")
-    st.markdown(
-        "<div style='text-align: center; color: #999; font-size: 0.85rem;'>🎓 UniHelp - Challenge IA Night © 2025 | IIT / NAU</div>",
-        unsafe_allow_html=True
+    st.html(
+        "<div style='text-align: center; color: #999; font-size: 0.85rem;'>🎓 UniHelp - Challenge IA Night © 2025 | IIT / NAU</div>"
     )
 
 
@@ -735,7 +958,7 @@ def email_interface():
     """Email generator tab."""
     st.markdown("### ✉️ Générateur d'Emails")
 
-    student = st.session_state.get('student', DEFAULT_STUDENT)
+    student = st.session_state.get('student') or Student()
 
     col1, col2 = st.columns([1, 1])
     with col1:
@@ -746,14 +969,14 @@ def email_interface():
         ])
 
         st.markdown("#### 👤 Vos infos")
-        name = st.text_input("Nom", value=student.get('name', ''))
-        student_id = st.text_input("Numéro étudiant", value=student.get('id', ''))
-        email = st.text_input("Email", value=student.get('email', ''))
+        name = st.text_input("Nom", value=student.name)
+        student_id = st.text_input("Numéro étudiant", value=student.id)
+        email = st.text_input("Email", value=student.email)
         add_info = st.text_area("Informations supplémentaires", height=100)
 
     with col2:
         if st.button("✨ Générer", type="primary", use_container_width=True):
-            client = get_openai_client()
+            client = st.session_state.get('openai_client')
             if client:
                 try:
                     response = client.chat.completions.create(
@@ -0,0 +1,40 @@
+"""Shared API clients, created once per process."""
+import functools
+from typing import Optional
+from openai import OpenAI
+from .config import Config
+
+# Optional local embedding models running on ONNX Runtime
+try:
+    from fastembed import TextEmbedding
+except ImportError:
+    TextEmbedding = None
+
+
+@functools.lru_cache(maxsize=None)
+def get_openai_client() -> OpenAI:
+    """
+    Get the process-wide OpenAI client.
+
+    Returns:
+        OpenAI client reusing one connection pool for every caller
+    """
+    return OpenAI(api_key=Config.OPENAI_API_KEY)
+
+
+@functools.lru_cache(maxsize=None)
+def get_local_embedder() -> Optional["TextEmbedding"]:
+    """
+    Get the process-wide local embedding model named by Config.QUERY_EMBEDDER.
+
+    Returns:
+        fastembed TextEmbedding, or None when embeddings come from OpenAI
+    """
+    if not Config.QUERY_EMBEDDER:
+        return None
+    backend, _, model_name = Config.QUERY_EMBEDDER.partition(":")
+    if backend != "fastembed" or not model_name:
+        raise ValueError(f"Unsupported QUERY_EMBEDDER: {Config.QUERY_EMBEDDER}")
+    if TextEmbedding is None:
+        raise ImportError("QUERY_EMBEDDER requires fastembed: pip install fastembed")
+    return TextEmbedding(model_name=model_name)
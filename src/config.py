@@ -12,24 +12,114 @@ class Config:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
     MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o-mini")
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+    # Shortened text-embedding-3 vectors (e.g. 512), empty keeps the model's full size
+    EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM") or 0) or None
+    # Local model replacing OpenAI embeddings in the SDK vector store, e.g.
+    # "fastembed:BAAI/bge-small-en-v1.5"; vectors differ from OpenAI ones, so
+    # point QDRANT_COLLECTION_NAME at a collection ingested with the same model
+    QUERY_EMBEDDER = os.getenv("QUERY_EMBEDDER", "")
 
     # Qdrant
     QDRANT_URL = os.getenv("QDRANT_URL", "localhost:6333")
     QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", "")
     QDRANT_COLLECTION_NAME = os.getenv("QDRANT_COLLECTION_NAME", "university_docs")
+    QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true"
+    QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+    # Request timeout (seconds) and retries of transient failures, with exponential backoff
+    QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "30"))
+    QDRANT_RETRIES = int(os.getenv("QDRANT_RETRIES", "3"))
 
     # Remove port from URL for cloud Qdrant if present in URL format
     if "://qdrant.io:" in QDRANT_URL or "://gcp.cloud.qdrant.io:" in QDRANT_URL:
         # Cloud URL already has port embedded
         pass
 
+    # HNSW graph links and build beam for new collections, and search beam width
+    HNSW_M = int(os.getenv("HNSW_M", "24"))
+    HNSW_EF_CONSTRUCT = int(os.getenv("HNSW_EF_CONSTRUCT", "200"))
+    HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "128"))
+    # Single searches short of their limit retry with a doubled beam, at most
+    # HNSW_EF_RETRIES times and up to HNSW_EF_MAX. Only collections of at least
+    # HNSW_RETRY_MIN_POINTS points retry, smaller ones are scanned exactly anyway.
+    HNSW_EF_RETRIES = int(os.getenv("HNSW_EF_RETRIES", "2"))
+    HNSW_EF_MAX = int(os.getenv("HNSW_EF_MAX", "512"))
+    HNSW_RETRY_MIN_POINTS = int(os.getenv("HNSW_RETRY_MIN_POINTS", "20000"))
+
+    # Metadata fields with keyword payload indexes, so filtered searches stay on the graph:
+    # documents are filtered by source and deduplicated by hash, cached answers by student
+    DOCUMENT_PAYLOAD_FIELDS = ("source", "content_hash")
+    CACHE_PAYLOAD_FIELDS = ("specialty", "student_year")
+
+    # Quantization: "scalar" (int8) or "binary" (1-bit) copies kept in RAM, empty disables it.
+    # Binary keeps less information, so it fetches more candidates to rescore.
+    QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "scalar")
+    QUANTIZATION_OVERSAMPLING = float(os.getenv("QUANTIZATION_OVERSAMPLING", "2.0"))
+    BINARY_OVERSAMPLING = float(os.getenv("BINARY_OVERSAMPLING", "3.0"))
+
+    # Keep original vectors of new collections memory-mapped on disk. Searches then
+    # use the in-RAM quantized copy and only rescoring reads vectors from the page
+    # cache, so RAM use drops sharply at the cost of slower queries until it is warm.
+    QDRANT_VECTORS_ON_DISK = os.getenv("QDRANT_VECTORS_ON_DISK", "false").lower() == "true"
+    # Segment size (KB) above which the optimizer memory-maps vector storage
+    QDRANT_MEMMAP_THRESHOLD = int(os.getenv("QDRANT_MEMMAP_THRESHOLD", "20000"))
+    # Storage type of original vectors in new collections: "float16" halves their
+    # memory and the reads made when rescoring, empty keeps Qdrant's float32
+    QDRANT_VECTOR_DATATYPE = os.getenv("QDRANT_VECTOR_DATATYPE", "")
+
+    # Semantic response cache for the chat app
+    SEMANTIC_CACHE_COLLECTION = os.getenv("SEMANTIC_CACHE_COLLECTION", "response_cache")
+    SEMANTIC_CACHE_THRESHOLD = 0.92
+    SEMANTIC_CACHE_TTL = 24 * 3600
+
     # Chunking
     CHUNK_SIZE = 512
     CHUNK_OVERLAP = 50
+    # Characters of each chunk stored as a short preview for UI answers
+    PREVIEW_CHARS = 400
+
+    # Extraction: files processed at once
+    FILE_WORKERS = int(os.getenv("FILE_WORKERS", "4"))
+
+    # Embedding: texts and tokens per OpenAI call (API max is 2048 inputs and
+    # 300K tokens per request), and concurrent calls
+    EMBEDDING_BATCH_SIZE = 128
+    EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "100000"))
+    EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "8"))
+    # Query and chip embeddings kept in memory (about 6 KB each at 1536 dims)
+    EMBEDDING_CACHE_SIZE = 4096
+    # On-disk embedding cache used by the SDK vector store when diskcache is installed
+    EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./.emb_cache")
+    # SQLite file holding chunk texts for the SDK vector store, outside the Qdrant payload
+    TEXT_STORE_PATH = os.getenv("TEXT_STORE_PATH", "./chunk_texts.sqlite")
+    # Reuse cached vectors of near-duplicate texts (MinHash, needs datasketch)
+    FUZZY_EMBED_CACHE = os.getenv("FUZZY_EMBED_CACHE", "0") == "1"
+
+    # Ingestion: concurrent Qdrant uploads, one per embedding batch
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
 
     # App
     APP_TITLE = os.getenv("APP_TITLE", "UniHelp - Assistant Universitaire")
 
+    @classmethod
+    def quantization(cls) -> str:
+        """
+        Quantization mode to apply to collections.
+
+        Binary quantization only keeps recall for text-embedding-3 vectors,
+        other models fall back to scalar.
+
+        Returns:
+            "scalar", "binary", or "" when disabled
+        """
+        if cls.QDRANT_QUANTIZATION == "binary" and not cls.EMBEDDING_MODEL.startswith("text-embedding-3-"):
+            return "scalar"
+        return cls.QDRANT_QUANTIZATION
+
+    @classmethod
+    def quantization_oversampling(cls) -> float:
+        """Candidate oversampling factor for rescoring quantized search results."""
+        return cls.BINARY_OVERSAMPLING if cls.quantization() == "binary" else cls.QUANTIZATION_OVERSAMPLING
+
     @classmethod
     def validate(cls):
         """Validate required configuration."""
@@ -0,0 +1,60 @@
+"""Split embedding inputs into OpenAI requests by token count."""
+import functools
+from typing import List, Tuple
+from .config import Config
+
+# Exact token counts when tiktoken is installed, a character estimate otherwise
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str):
+    """Tokenizer of an embedding model, loaded once per process."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(texts: List[str]) -> List[int]:
+    """
+    Count the tokens of each text for the configured embedding model.
+
+    Args:
+        texts: Texts to measure
+
+    Returns:
+        Token count of each text, estimated at 4 characters per token without tiktoken
+    """
+    if tiktoken is None:
+        return [len(text) // 4 + 1 for text in texts]
+    return [len(tokens) for tokens in _encoding(Config.EMBEDDING_MODEL).encode_ordinary_batch(texts)]
+
+
+def batch_ranges(texts: List[str]) -> List[Tuple[int, int]]:
+    """
+    Greedily pack consecutive texts into embedding requests.
+
+    Each request stays under both EMBEDDING_BATCH_SIZE inputs and
+    EMBEDDING_BATCH_TOKENS tokens; a single text over the token budget
+    still gets a request of its own.
+
+    Args:
+        texts: Texts to embed, in order
+
+    Returns:
+        (start, end) slice bounds of each request, covering all texts in order
+    """
+    ranges = []
+    start, tokens = 0, 0
+    for i, count in enumerate(count_tokens(texts)):
+        if i > start and (i - start >= Config.EMBEDDING_BATCH_SIZE or tokens + count > Config.EMBEDDING_BATCH_TOKENS):
+            ranges.append((start, i))
+            start, tokens = i, 0
+        tokens += count
+    if start < len(texts):
+        ranges.append((start, len(texts)))
+    return ranges
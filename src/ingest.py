@@ -1,5 +1,8 @@
 """Data ingestion pipeline for processing PDFs and storing in vector database."""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Optional, Tuple
 from .pdf_extractor import DocumentExtractor
 from .chunker import TextChunker
 from .qdrant_rest import QdrantRESTClient as VectorStore
@@ -39,9 +42,15 @@ class IngestionPipeline:
             print("Clearing existing data...")
             self.vector_store.clear_collection()
 
-        # Extract text from PDFs
-        print(f"Extracting text from {data_dir}...")
-        documents = self.extractor.extract_from_directory(data_path)
+        # Extract and chunk files in parallel
+        print(f"Extracting and chunking documents from {data_dir}...")
+        files = self.extractor.list_files(data_path)
+        with ThreadPoolExecutor(max_workers=Config.FILE_WORKERS) as executor:
+            documents = {
+                name: file_chunks
+                for name, file_chunks in executor.map(self._process_file, files)
+                if file_chunks is not None
+            }
 
         if not documents:
             return {
@@ -50,12 +59,11 @@ class IngestionPipeline:
                 "files_processed": 0
             }
 
-        # Chunk documents
-        print("Chunking documents...")
-        chunks = self.chunker.chunk_documents(documents)
+        chunks = [chunk for file_chunks in documents.values() for chunk in file_chunks]
 
         # Format for Qdrant
         texts, metadatas = self.chunker.format_for_qdrant(chunks)
+        texts, metadatas = self._skip_duplicates(texts, metadatas)
 
         # Add to vector store
         print("Adding to vector store...")
@@ -72,6 +80,60 @@ class IngestionPipeline:
             "total_documents": info["points_count"]
         }
 
+    def _skip_duplicates(self, texts: List[str], metadatas: List[dict]) -> Tuple[List[str], List[dict]]:
+        """
+        Drop chunks repeated within this run or already stored in the collection.
+
+        Each kept chunk records its content hash in its metadata, so later
+        runs can recognize it.
+
+        Args:
+            texts: Chunk texts
+            metadatas: Chunk metadata, in the same order
+
+        Returns:
+            Tuple of (texts list, metadata list) left to embed
+        """
+        hashes = [hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest() for text in texts]
+        try:
+            seen = self.vector_store.existing_hashes(list(set(hashes)))
+        except Exception as e:
+            print(f"Warning: Could not check stored chunks: {e}")
+            seen = set()
+
+        kept_texts, kept_metadatas = [], []
+        for text, meta, content_hash in zip(texts, metadatas, hashes):
+            if content_hash in seen:
+                continue
+            seen.add(content_hash)
+            kept_texts.append(text)
+            kept_metadatas.append({**meta, "content_hash": content_hash})
+
+        skipped = len(texts) - len(kept_texts)
+        if skipped:
+            print(f"Skipping {skipped} duplicate chunks")
+        return kept_texts, kept_metadatas
+
+    def _process_file(self, file_path: Path) -> Tuple[str, Optional[List[dict]]]:
+        """
+        Extract and chunk a single file.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            Tuple of (file name, chunk dictionaries), with None as chunks
+            when extraction failed
+        """
+        try:
+            text = self.extractor.extract_text(file_path)
+        except Exception as e:
+            print(f"Warning: Failed to extract {file_path.name}: {e}")
+            return file_path.name, None
+
+        print(f"Extracted {len(text)} characters from {file_path.name}")
+        return file_path.name, self.chunker.chunk_documents({file_path.name: text})
+
     def ingest_file(self, file_path: str) -> dict:
         """
         Ingest a single PDF file.
@@ -1,17 +1,46 @@
 """Qdrant REST API client - bypasses numpy dependency issues."""
 import os
+import base64
+import hashlib
+import threading
 import requests
-from typing import List, Dict, Optional
+from array import array
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
 from .config import Config
+from .embedding_batches import batch_ranges
+
+# orjson serializes the large float lists of embeddings much faster, fall back to json
+try:
+    import orjson
+
+    def _dumps(data) -> bytes:
+        return orjson.dumps(data)
+
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    def _dumps(data) -> bytes:
+        return json.dumps(data).encode("utf-8")
+
+    _loads = json.loads
 
 
 class QdrantRESTClient:
     """Qdrant client using REST API instead of Python SDK."""
 
-    def __init__(self):
+    # Embeddings keyed by sha256(model:dimensions::text), shared by every client and kept as float32
+    _embedding_cache: "OrderedDict[str, array]" = OrderedDict()
+    _embedding_cache_lock = threading.Lock()
+
+    def __init__(self, collection_name: Optional[str] = None, indexed_fields: Optional[tuple] = None):
         self.url = Config.QDRANT_URL
         self.api_key = Config.QDRANT_API_KEY
-        self.collection_name = Config.QDRANT_COLLECTION_NAME
+        self.collection_name = collection_name or Config.QDRANT_COLLECTION_NAME
         self.openai_key = Config.OPENAI_API_KEY
         self.embedding_model = Config.EMBEDDING_MODEL
 
@@ -19,53 +48,132 @@ class QdrantRESTClient:
         if self.api_key:
             self.headers["api-key"] = self.api_key
 
-        self._ensure_collection()
+        # Keep-alive connections shared by the ingestion and search threads
+        self.session = self._create_session()
+        self.openai_session = self._create_session()
+
+        self.indexed_fields = Config.DOCUMENT_PAYLOAD_FIELDS if indexed_fields is None else indexed_fields
+        self._ensure_collection(self.indexed_fields)
+
+    @staticmethod
+    def _create_session() -> requests.Session:
+        """Create a pooled HTTP session that retries transient failures."""
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=None,
+            raise_on_status=False
+        )
+        # Enough keep-alive connections for every embedding and upload worker
+        pool_size = max(32, Config.EMBED_WORKERS + Config.INGEST_WORKERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
 
     def _get(self, endpoint: str) -> dict:
         """Make a GET request."""
-        response = requests.get(f"{self.url}/{endpoint}", headers=self.headers, timeout=30)
+        response = self.session.get(f"{self.url}/{endpoint}", headers=self.headers, timeout=30)
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
 
     def _post(self, endpoint: str, data: dict) -> dict:
         """Make a POST request."""
-        response = requests.post(f"{self.url}/{endpoint}", json=data, headers=self.headers, timeout=60)
+        response = self.session.post(f"{self.url}/{endpoint}", data=_dumps(data), headers=self.headers, timeout=60)
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
 
     def _put(self, endpoint: str, data: dict) -> dict:
         """Make a PUT request."""
-        response = requests.put(f"{self.url}/{endpoint}", json=data, headers=self.headers, timeout=60)
+        response = self.session.put(f"{self.url}/{endpoint}", data=_dumps(data), headers=self.headers, timeout=60)
+        response.raise_for_status()
+        return _loads(response.content)
+
+    def _patch(self, endpoint: str, data: dict) -> dict:
+        """Make a PATCH request."""
+        response = self.session.patch(f"{self.url}/{endpoint}", data=_dumps(data), headers=self.headers, timeout=60)
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
 
     def _delete(self, endpoint: str) -> dict:
         """Make a DELETE request."""
-        response = requests.delete(f"{self.url}/{endpoint}", headers=self.headers, timeout=30)
+        response = self.session.delete(f"{self.url}/{endpoint}", headers=self.headers, timeout=30)
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
 
-    def _ensure_collection(self):
-        """Create collection if it doesn't exist."""
+    def _ensure_collection(self, indexed_fields: tuple = ()):
+        """Create collection if it doesn't exist, indexing the given metadata fields."""
         try:
             collections = self._get("collections")
             names = [c["name"] for c in collections.get("result", {}).get("collections", [])]
 
             if self.collection_name not in names:
-                self._put(f"collections/{self.collection_name}", {
+                config = {
                     "vectors": {
                         "size": self._get_embedding_dim(),
-                        "distance": "Cosine"
-                    }
-                })
+                        "distance": "Cosine",
+                        "on_disk": Config.QDRANT_VECTORS_ON_DISK
+                    },
+                    "hnsw_config": {"m": Config.HNSW_M, "ef_construct": Config.HNSW_EF_CONSTRUCT}
+                }
+                if Config.QDRANT_VECTOR_DATATYPE:
+                    config["vectors"]["datatype"] = Config.QDRANT_VECTOR_DATATYPE
+                if Config.QDRANT_VECTORS_ON_DISK:
+                    config["optimizers_config"] = {"memmap_threshold": Config.QDRANT_MEMMAP_THRESHOLD}
+                quantization = self._quantization_config()
+                if quantization:
+                    config["quantization_config"] = quantization
+                self._put(f"collections/{self.collection_name}", config)
+                for field in indexed_fields:
+                    self._put(f"collections/{self.collection_name}/index", {
+                        "field_name": f"meta.{field}",
+                        "field_schema": "keyword"
+                    })
                 print(f"Created collection: {self.collection_name}")
             else:
                 print(f"Using existing collection: {self.collection_name}")
         except Exception as e:
             print(f"Error ensuring collection: {e}")
 
+    def _quantization_config(self) -> Optional[dict]:
+        """Build the collection quantization config from settings."""
+        if Config.quantization() == "scalar":
+            return {"scalar": {"type": "int8", "quantile": 0.99, "always_ram": True}}
+        if Config.quantization() == "binary":
+            return {"binary": {"always_ram": True}}
+        return None
+
+    def _search_params(self) -> Optional[dict]:
+        """Search params: HNSW beam width, and rescoring of quantized candidates with the original vectors."""
+        params = {"hnsw_ef": Config.HNSW_EF_SEARCH}
+        if self._quantization_config():
+            params["quantization"] = {
+                "rescore": True,
+                "oversampling": Config.quantization_oversampling()
+            }
+        return params
+
+    def ensure_quantization(self):
+        """Enable quantization on an existing collection if it is missing."""
+        quantization = self._quantization_config()
+        if not quantization:
+            return
+
+        try:
+            info = self._get(f"collections/{self.collection_name}")
+            current = info.get("result", {}).get("config", {}).get("quantization_config")
+            if current != quantization:
+                self._patch(f"collections/{self.collection_name}", {"quantization_config": quantization})
+                print(f"Enabled quantization on collection: {self.collection_name}")
+        except Exception as e:
+            print(f"Error ensuring quantization: {e}")
+
     def _get_embedding_dim(self) -> int:
         """Get embedding dimension."""
+        if self._embedding_dimensions():
+            return Config.EMBEDDING_DIM
         model = self.embedding_model
         if "3-small" in model or "ada-002" in model:
             return 1536
@@ -73,37 +181,81 @@ class QdrantRESTClient:
             return 3072
         return 1536
 
+    def _embedding_dimensions(self) -> Optional[int]:
+        """Requested embedding size, only text-embedding-3 models can shorten vectors."""
+        if Config.EMBEDDING_DIM and "text-embedding-3" in self.embedding_model:
+            return Config.EMBEDDING_DIM
+        return None
+
     def _create_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Create embeddings using OpenAI REST API."""
+        """Create embeddings, reusing cached vectors and embedding only the misses."""
+        model_id = f"{self.embedding_model}:{self._embedding_dimensions()}"
+        keys = [hashlib.sha256(f"{model_id}::{text}".encode("utf-8")).hexdigest() for text in texts]
+        cache = self._embedding_cache
+        with self._embedding_cache_lock:
+            vectors = [cache.get(key) for key in keys]
+            for key, vector in zip(keys, vectors):
+                if vector is not None:
+                    cache.move_to_end(key)
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            fresh = self._embed_uncached([texts[i] for i in missing])
+            with self._embedding_cache_lock:
+                for i, embedding in zip(missing, fresh):
+                    vectors[i] = cache[keys[i]] = embedding
+                while len(cache) > Config.EMBEDDING_CACHE_SIZE:
+                    cache.popitem(last=False)
+
+        # Lists only at the JSON boundary, cached vectors stay compact arrays
+        return [vector.tolist() for vector in vectors]
+
+    def _embed_uncached(self, texts: List[str]) -> List[array]:
+        """Create embeddings, splitting large inputs into concurrent sub-batches."""
+        batches = [texts[start:end] for start, end in batch_ranges(texts)]
+        if len(batches) <= 1:
+            return self._embed_batch(texts)
+
+        with ThreadPoolExecutor(max_workers=Config.EMBED_WORKERS) as executor:
+            return [embedding for batch in executor.map(self._embed_batch, batches) for embedding in batch]
+
+    def _embed_batch(self, texts: List[str]) -> List[array]:
+        """Create embeddings for one batch using OpenAI REST API, as float32 arrays."""
         headers = {
             "Authorization": f"Bearer {self.openai_key}",
             "Content-Type": "application/json"
         }
 
+        # base64 float32 is about a quarter of the size of JSON float text
         data = {
             "model": self.embedding_model,
-            "input": texts
+            "input": texts,
+            "encoding_format": "base64"
         }
+        dimensions = self._embedding_dimensions()
+        if dimensions:
+            data["dimensions"] = dimensions
 
-        response = requests.post(
+        response = self.openai_session.post(
             "https://api.openai.com/v1/embeddings",
-            json=data,
+            data=_dumps(data),
             headers=headers,
             timeout=30
         )
         response.raise_for_status()
-        result = response.json()
+        result = _loads(response.content)
 
-        return [item["embedding"] for item in result["data"]]
+        return [array("f", base64.b64decode(item["embedding"])) for item in result["data"]]
+
+    def _embed_query(self, query: str) -> List[float]:
+        """Embed a single query, served from the embedding cache when repeated."""
+        return self._create_embeddings([query])[0]
 
     def add_documents(self, texts: List[str], metadatas: List[Dict]) -> int:
         """Add documents to collection."""
         if not texts:
             return 0
 
-        print(f"Creating embeddings for {len(texts)} chunks...")
-        embeddings = self._create_embeddings(texts)
-
         # Get current count
         try:
             info = self._get(f"collections/{self.collection_name}")
@@ -111,49 +263,174 @@ class QdrantRESTClient:
         except:
             offset = 0
 
-        # Create points
-        points = []
-        for i, (text, embedding, meta) in enumerate(zip(texts, embeddings, metadatas)):
-            points.append({
-                "id": offset + i,
-                "vector": embedding,
-                "payload": {**meta, "text": text}
-            })
-
-        # Upload in batches
-        batch_size = 100
-        for i in range(0, len(points), batch_size):
-            batch = points[i:i+batch_size]
-            self._put(f"collections/{self.collection_name}/points", {"points": batch})
-
-        print(f"Added {len(points)} documents to collection")
-        return len(points)
-
-    def search(self, query: str, limit: int = 5) -> List[Dict]:
+        # Upload each point batch as soon as its embeddings arrive
+        print(f"Creating embeddings for {len(texts)} chunks...")
+        with ThreadPoolExecutor(max_workers=Config.INGEST_WORKERS) as executor:
+            uploads = [
+                executor.submit(
+                    self._put,
+                    f"collections/{self.collection_name}/points?wait=false",
+                    {"points": points}
+                )
+                for points in self._embed_batches(texts, metadatas, offset)
+            ]
+            for upload in uploads:
+                upload.result()
+
+        print(f"Added {len(texts)} documents to collection")
+        return len(texts)
+
+    def _embed_batches(self, texts: List[str], metadatas: List[Dict], offset: int) -> Iterator[List[Dict]]:
+        """
+        Embed texts in concurrent batches and yield Qdrant points per batch.
+
+        Batches are yielded in completion order rather than input order;
+        point ids come from each batch's position, so they stay aligned.
+        """
+        with ThreadPoolExecutor(max_workers=Config.EMBED_WORKERS) as embedder:
+            pending = {
+                embedder.submit(self._embed_batch, texts[start:end]): (start, end)
+                for start, end in batch_ranges(texts)
+            }
+            for future in as_completed(pending):
+                start, end = pending[future]
+                yield [
+                    {
+                        "id": offset + i,
+                        "vector": embedding.tolist(),
+                        "payload": {"meta": meta, "text": text, "preview": text[:Config.PREVIEW_CHARS]}
+                    }
+                    for i, (text, embedding, meta) in enumerate(
+                        zip(texts[start:end], future.result(), metadatas[start:end]),
+                        start
+                    )
+                ]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the collection's embedding model."""
+        return self._create_embeddings(texts)
+
+    def search(self, query: str, limit: int = 5, preview: bool = False,
+               filters: Optional[Dict] = None) -> List[Dict]:
         """Search for similar documents."""
-        query_embedding = self._create_embeddings([query])[0]
-
-        result = self._post(f"collections/{self.collection_name}/points/query", {
+        query_embedding = self._embed_query(query)
+        return self.search_by_vector(query_embedding, limit=limit, preview=preview, filters=filters)
+
+    def search_by_vector(self, query_embedding: List[float], limit: int = 5,
+                         preview: bool = False, filters: Optional[Dict] = None,
+                         ranges: Optional[Dict] = None) -> List[Dict]:
+        """
+        Search with a precomputed query embedding.
+
+        With preview=True only the stored text preview is transferred
+        instead of the full chunk text. filters maps metadata keys to the
+        exact values they must match, ranges maps numeric metadata keys to
+        Qdrant range bounds such as {"gte": 10}.
+        """
+        request = {
             "query": query_embedding,
             "limit": limit,
-            "with_payload": True
-        })
+            "with_payload": {"exclude": ["text"]} if preview else True
+        }
+        conditions = [{"key": f"meta.{key}", "match": {"value": value}} for key, value in (filters or {}).items()]
+        conditions += [{"key": f"meta.{key}", "range": bounds} for key, bounds in (ranges or {}).items()]
+        if conditions:
+            request["filter"] = {"must": conditions}
+        params = self._search_params()
+        if params:
+            request["params"] = params
+
+        result = self._post(f"collections/{self.collection_name}/points/query", request)
 
-        results = []
         # Response format: {"result": {"points": [...]}}
         points_data = result.get("result", {}).get("points", result.get("result", []))
+        if preview:
+            self._fill_missing_previews(points_data)
+        return self._format_points(points_data)
+
+    def _fill_missing_previews(self, points_data: List[Dict]):
+        """Fetch the full text of points stored before previews existed, in one request."""
+        missing = {point["id"]: point for point in points_data if "preview" not in point.get("payload", {})}
+        if not missing:
+            return
+        result = self._post(f"collections/{self.collection_name}/points", {
+            "ids": list(missing),
+            "with_payload": ["text"],
+            "with_vector": False
+        })
+        for record in result.get("result", []):
+            missing[record["id"]].setdefault("payload", {})["text"] = record.get("payload", {}).get("text", "")
 
+    def upsert_point(self, point_id: str, vector: List[float], payload: Dict):
+        """Insert or replace a single point, payload is stored as its metadata."""
+        self._put(f"collections/{self.collection_name}/points", {
+            "points": [{"id": point_id, "vector": list(vector), "payload": {"meta": payload}}]
+        })
+
+    def search_batch(self, queries: List[str], limit: int = 5) -> List[List[Dict]]:
+        """Search several queries with one embedding call and one Qdrant round-trip."""
+        if not queries:
+            return []
+
+        query_embeddings = self._create_embeddings(queries)
+        params = self._search_params()
+
+        searches = []
+        for embedding in query_embeddings:
+            request = {"query": embedding, "limit": limit, "with_payload": True}
+            if params:
+                request["params"] = params
+            searches.append(request)
+
+        result = self._post(f"collections/{self.collection_name}/points/query/batch", {
+            "searches": searches
+        })
+
+        # Response format: {"result": [{"points": [...]}, ...]} in query order
+        return [self._format_points(item.get("points", [])) for item in result.get("result", [])]
+
+    def _format_points(self, points_data: List[Dict]) -> List[Dict]:
+        """Convert Qdrant points into search result dictionaries."""
+        results = []
         for point in points_data:
             payload = point.get("payload", {}) if isinstance(point, dict) else {}
+            # Payloads are decoded fresh per response, so fields are popped in place
+            text = payload.pop("text", None)
+            preview = payload.pop("preview", "")
+            # Points written before metadata moved under "meta" keep it flat
+            meta = payload.get("meta", payload)
 
             results.append({
-                "text": payload.get("text", ""),
-                "metadata": {k: v for k, v in payload.items() if k != "text"},
+                "text": preview if text is None else text,
+                "metadata": meta,
                 "score": point.get("score", 0)
             })
 
         return results
 
+    def existing_hashes(self, hashes: List[str]) -> set:
+        """Return the content hashes already stored in the collection."""
+        found = set()
+        for start in range(0, len(hashes), 1000):
+            group = hashes[start:start + 1000]
+            # Several chunks can share a hash, so page through every match
+            offset = None
+            while True:
+                request = {
+                    "filter": {"must": [{"key": "meta.content_hash", "match": {"any": group}}]},
+                    "with_payload": ["meta.content_hash"],
+                    "with_vector": False,
+                    "limit": 1000
+                }
+                if offset is not None:
+                    request["offset"] = offset
+                result = self._post(f"collections/{self.collection_name}/points/scroll", request).get("result", {})
+                found.update(point["payload"]["meta"]["content_hash"] for point in result.get("points", []))
+                offset = result.get("next_page_offset")
+                if offset is None:
+                    break
+        return found
+
     def get_collection_info(self) -> Dict:
         """Get collection info."""
         result = self._get(f"collections/{self.collection_name}")
@@ -164,13 +441,18 @@ class QdrantRESTClient:
             "vector_size": info.get("config", {}).get("params", {}).get("vectors", {}).get("size", 0)
         }
 
+    def has_points(self) -> bool:
+        """Check whether the collection holds any points, using an approximate count."""
+        result = self._post(f"collections/{self.collection_name}/points/count", {"exact": False})
+        return result.get("result", {}).get("count", 0) > 0
+
     def clear_collection(self):
         """Delete collection and recreate."""
         try:
             self._delete(f"collections/{self.collection_name}")
         except:
             pass
-        self._ensure_collection()
+        self._ensure_collection(self.indexed_fields)
         print(f"Cleared collection: {self.collection_name}")
 
 
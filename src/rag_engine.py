@@ -1,9 +1,13 @@
 """RAG engine for answering university questions."""
+import re
 from typing import List, Dict, Optional
-from openai import OpenAI
+from .clients import get_openai_client
 from .config import Config
 from .qdrant_rest import QdrantRESTClient as VectorStore
 
+# Source headers written by RAGEngine.retrieve_context
+_SOURCE_RE = re.compile(r'\[Document \d+ - ([^\]]+)\]')
+
 
 class RAGEngine:
     """Retrieval-Augmented Generation engine for Q&A."""
@@ -16,7 +20,7 @@ class RAGEngine:
             vector_store: VectorStore instance for retrieval
         """
         self.vector_store = vector_store or VectorStore()
-        self.openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        self.openai_client = get_openai_client()
 
         self.system_prompt = """Tu es UniHelp, un assistant IA pour les services universitaires de l'Institut International de Technologie / NAU.
 
@@ -148,11 +152,8 @@ Réponds toujours en français sauf si l'étudiant pose une question en anglais.
         }
 
     def _extract_sources(self, context: str) -> List[str]:
-        """Extract source document names from context."""
-        import re
-        pattern = r'\[Document \d+ - ([^\]]+)\]'
-        matches = re.findall(pattern, context)
-        return list(set(matches))
+        """Extract source document names from context, in retrieval order."""
+        return list(dict.fromkeys(_SOURCE_RE.findall(context)))
 
 
 class EmailGenerator:
@@ -160,7 +161,7 @@ class EmailGenerator:
 
     def __init__(self):
         """Initialize the email generator."""
-        self.openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        self.openai_client = get_openai_client()
 
         self.system_prompt = """Tu es un assistant qui génère des emails administratifs professionnels pour les étudiants de l'Institut International de Technologie.
 
@@ -2,6 +2,10 @@
 from typing import List
 import re
 
+# Paragraph breaks, and sentence ends used to split oversized paragraphs
+_PARAGRAPH_RE = re.compile(r'\n\s*\n')
+_SENTENCE_RE = re.compile(r'[.!?]+\s+')
+
 
 class Chunk:
     """Simple chunk class."""
@@ -39,48 +43,52 @@ class SimpleTokenChunker:
             return []
 
         # Split text into paragraphs first
-        paragraphs = re.split(r'\n\s*\n', text.strip())
-        paragraphs = [p.strip() for p in paragraphs if p.strip()]
+        paragraphs = [p for p in map(str.strip, _PARAGRAPH_RE.split(text.strip())) if p]
+
+        # Bind the settings once instead of reading attributes per piece
+        chunk_size, chunk_overlap = self.chunk_size, self.chunk_overlap
 
         chunks = []
-        current_chunk = ""
-        current_tokens = 0
+        # Pieces of the current chunk, joined once when it is emitted, and its
+        # words, so each piece of text is split exactly once
+        parts = []
+        words = []
 
         for paragraph in paragraphs:
-            paragraph_tokens = len(paragraph.split())
+            paragraph_words = paragraph.split()
 
             # If single paragraph is too large, split by sentences
-            if paragraph_tokens > self.chunk_size:
-                sentences = re.split(r'[.!?]+\s+', paragraph)
+            if len(paragraph_words) > chunk_size:
+                sentences = _SENTENCE_RE.split(paragraph)
                 for sentence in sentences:
                     if not sentence.strip():
                         continue
-                    sentence_tokens = len(sentence.split())
+                    sentence_words = sentence.split()
 
-                    if current_tokens + sentence_tokens > self.chunk_size and current_chunk:
-                        chunks.append(Chunk(current_chunk, current_tokens))
+                    if len(words) + len(sentence_words) > chunk_size and parts:
+                        chunks.append(Chunk("".join(parts), len(words)))
                         # Keep overlap
-                        overlap_text = ' '.join(current_chunk.split()[-self.chunk_overlap:])
-                        current_chunk = overlap_text + " " + sentence if overlap_text else sentence
-                        current_tokens = len(current_chunk.split())
+                        overlap_words = words[-chunk_overlap:]
+                        parts = [" ".join(overlap_words), " ", sentence] if overlap_words else [sentence]
+                        words = overlap_words + sentence_words
                     else:
-                        current_chunk = current_chunk + " " + sentence if current_chunk else sentence
-                        current_tokens += sentence_tokens
+                        parts += [" ", sentence] if parts else [sentence]
+                        words += sentence_words
 
             # Regular paragraph handling
-            elif current_tokens + paragraph_tokens > self.chunk_size and current_chunk:
-                chunks.append(Chunk(current_chunk, current_tokens))
+            elif len(words) + len(paragraph_words) > chunk_size and parts:
+                chunks.append(Chunk("".join(parts), len(words)))
                 # Keep overlap
-                overlap_words = current_chunk.split()[-self.chunk_overlap:]
-                current_chunk = ' '.join(overlap_words) + " " + paragraph
-                current_tokens = len(current_chunk.split())
+                overlap_words = words[-chunk_overlap:]
+                parts = [" ".join(overlap_words), " ", paragraph]
+                words = overlap_words + paragraph_words
             else:
-                current_chunk = current_chunk + "\n\n" + paragraph if current_chunk else paragraph
-                current_tokens += paragraph_tokens
+                parts += ["\n\n", paragraph] if parts else [paragraph]
+                words += paragraph_words
 
         # Add final chunk
-        if current_chunk:
-            chunks.append(Chunk(current_chunk, current_tokens))
+        if parts:
+            chunks.append(Chunk("".join(parts), len(words)))
 
         return chunks
 
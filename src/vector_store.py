@@ -1,12 +1,41 @@
 """Vector store module using Qdrant and OpenAI embeddings."""
+import base64
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Optional
-from openai import OpenAI
+from .clients import get_local_embedder, get_openai_client
 from .config import Config
+from .embedding_batches import batch_ranges
+
+# Persist embeddings across runs when diskcache is installed
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+# Optional near-duplicate lookup for the embedding cache
+try:
+    from datasketch import MinHash, MinHashLSH
+except ImportError:
+    MinHash = MinHashLSH = None
 
 # Try to use Qdrant SDK, fallback to REST API
 try:
+    import grpc
+    import numpy as np
     from qdrant_client import QdrantClient
-    from qdrant_client.models import Distance, VectorParams, PointStruct, QueryVector
+    from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+    from qdrant_client.models import (
+        Distance, VectorParams, Batch, QueryVector, QueryRequest, HnswConfigDiff, SearchParams,
+        ScalarQuantization, ScalarQuantizationConfig, ScalarType, QuantizationSearchParams,
+        BinaryQuantization, BinaryQuantizationConfig, OptimizersConfigDiff, PayloadSchemaType, Filter, FieldCondition, MatchValue
+    )
     USE_SDK = True
 except Exception:
     USE_SDK = False
@@ -16,27 +45,44 @@ except Exception:
 class VectorStore:
     """Manage document embeddings in Qdrant."""
 
-    def __init__(self, collection_name: Optional[str] = None):
+    _client = None
+    _client_lock = threading.Lock()
+    # Collections already checked or created by this process
+    _bootstrapped: set = set()
+    # Near-duplicate indexes per embedding model, rebuilt once per process from
+    # their stored signatures; MinHashLSH is not thread-safe
+    _lsh_indexes: Dict = {}
+    _lsh_lock = threading.Lock()
+    # Query embeddings shared by all instances, keyed by (model id, query), oldest first
+    _query_cache: OrderedDict = OrderedDict()
+    _query_cache_lock = threading.Lock()
+    # Collection sizes per name, with the monotonic time they were read
+    _point_counts: Dict = {}
+    # Minimum similarity of search results
+    SCORE_THRESHOLD = 0.5
+    # Minimum estimated Jaccard similarity for reusing a near-duplicate's vector
+    FUZZY_THRESHOLD = 0.95
+
+    def __init__(self, collection_name: Optional[str] = None, indexed_fields: Optional[tuple] = None):
         """
         Initialize the vector store.
 
         Args:
             collection_name: Name of the Qdrant collection
+            indexed_fields: Metadata fields to index, the document fields by default
         """
         self.collection_name = collection_name or Config.QDRANT_COLLECTION_NAME
-        self.openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        self.openai_client = get_openai_client()
+        # Local model embedding both documents and queries, without network round-trips
+        self.local_embedder = get_local_embedder()
+        self._local_dimension = None
+        self._emb_cache = diskcache.Cache(Config.EMBEDDING_CACHE_DIR) if diskcache else None
+        self._lsh = self._signatures = None
 
         # Try SDK first, fallback to REST
         if USE_SDK:
             try:
-                if Config.QDRANT_API_KEY:
-                    self.client = QdrantClient(
-                        url=Config.QDRANT_URL,
-                        api_key=Config.QDRANT_API_KEY,
-                        prefer_grpc=False
-                    )
-                else:
-                    self.client = QdrantClient(url=Config.QDRANT_URL)
+                self.client = self._get_client()
                 self.use_rest = False
             except Exception as e:
                 print(f"SDK init failed, using REST: {e}")
@@ -47,18 +93,96 @@ class VectorStore:
         if self.use_rest:
             # Import REST client
             from .qdrant_rest import QdrantRESTClient
-            self.rest_client = QdrantRESTClient()
+            if self.local_embedder is not None:
+                print("Warning: QUERY_EMBEDDER is only used by the Qdrant SDK store, REST embeds with OpenAI")
+            self.rest_client = QdrantRESTClient(self.collection_name, indexed_fields)
             # Copy methods
             self.add_documents = self.rest_client.add_documents
             self.search = self.rest_client.search
+            self.search_batch = self.rest_client.search_batch
             self.get_collection_info = self.rest_client.get_collection_info
             self.clear_collection = self.rest_client.clear_collection
             return
 
-        self._ensure_collection()
+        self._texts = self._open_text_store()
+        self._texts_lock = threading.Lock()
+        if Config.FUZZY_EMBED_CACHE and MinHashLSH and self._emb_cache is not None:
+            self._load_lsh()
+        self.indexed_fields = Config.DOCUMENT_PAYLOAD_FIELDS if indexed_fields is None else indexed_fields
+        self._ensure_collection(self.indexed_fields)
+
+    @staticmethod
+    def _open_text_store() -> sqlite3.Connection:
+        """Open the SQLite store holding chunk texts outside the Qdrant payload."""
+        connection = sqlite3.connect(Config.TEXT_STORE_PATH, check_same_thread=False)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS texts ("
+            "collection TEXT, id TEXT, text TEXT, PRIMARY KEY (collection, id))"
+        )
+        return connection
+
+    @classmethod
+    def _get_client(cls) -> "QdrantClient":
+        """
+        Get the Qdrant client shared by all instances.
+
+        Reusing one client keeps its gRPC channel and TLS session open
+        instead of reconnecting for every VectorStore.
+
+        Returns:
+            QdrantClient connected to Config.QDRANT_URL
+        """
+        if cls._client is None:
+            # Streamlit sessions run in threads, only the first one creates the client
+            with cls._client_lock:
+                if cls._client is None:
+                    cls._client = QdrantClient(
+                        url=Config.QDRANT_URL,
+                        api_key=Config.QDRANT_API_KEY or None,
+                        prefer_grpc=Config.QDRANT_PREFER_GRPC,
+                        grpc_port=Config.QDRANT_GRPC_PORT,
+                        timeout=Config.QDRANT_TIMEOUT,
+                        # Ping idle channels so load balancers don't drop them between searches
+                        grpc_options={"grpc.keepalive_time_ms": 10000}
+                    )
+        return cls._client
+
+    @staticmethod
+    def _call(method, *args, **kwargs):
+        """
+        Call a Qdrant client method, retrying transient failures.
+
+        Args:
+            method: Bound client method
+            *args: Positional arguments for the method
+            **kwargs: Keyword arguments for the method
+
+        Returns:
+            The method's result
+        """
+        for attempt in range(Config.QDRANT_RETRIES + 1):
+            try:
+                return method(*args, **kwargs)
+            except (UnexpectedResponse, ResponseHandlingException, grpc.RpcError) as e:
+                if attempt == Config.QDRANT_RETRIES or not VectorStore._is_transient(e):
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """Whether a failed Qdrant call is worth retrying (overload, unavailable or network error)."""
+        if isinstance(error, UnexpectedResponse):
+            return error.status_code in (429, 500, 502, 503, 504)
+        if isinstance(error, grpc.RpcError):
+            return error.code() in (
+                grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED, grpc.StatusCode.RESOURCE_EXHAUSTED
+            )
+        return True
 
-    def _ensure_collection(self):
-        """Create collection if it doesn't exist."""
+    def _ensure_collection(self, indexed_fields: tuple = ()):
+        """Create collection if it doesn't exist, indexing the given metadata fields; checked once per process."""
+        if self.collection_name in self._bootstrapped:
+            return
         try:
             collections = self.client.get_collections().collections
             collection_names = [c.name for c in collections]
@@ -68,18 +192,41 @@ class VectorStore:
                     collection_name=self.collection_name,
                     vectors_config=VectorParams(
                         size=self._get_embedding_dimension(),
-                        distance=Distance.COSINE
-                    )
+                        distance=Distance.COSINE,
+                        on_disk=Config.QDRANT_VECTORS_ON_DISK,
+                        # Only sent when set, older clients don't know the field
+                        **({"datatype": Config.QDRANT_VECTOR_DATATYPE} if Config.QDRANT_VECTOR_DATATYPE else {})
+                    ),
+                    hnsw_config=HnswConfigDiff(m=Config.HNSW_M, ef_construct=Config.HNSW_EF_CONSTRUCT),
+                    quantization_config=self._quantization_config(),
+                    optimizers_config=(
+                        OptimizersConfigDiff(memmap_threshold=Config.QDRANT_MEMMAP_THRESHOLD)
+                        if Config.QDRANT_VECTORS_ON_DISK else None
+                    ),
+                    on_disk_payload=True
                 )
+                for field in indexed_fields:
+                    self.client.create_payload_index(
+                        collection_name=self.collection_name,
+                        field_name=f"meta.{field}",
+                        field_schema=PayloadSchemaType.KEYWORD
+                    )
                 print(f"Created collection: {self.collection_name}")
             else:
                 print(f"Using existing collection: {self.collection_name}")
+            self._bootstrapped.add(self.collection_name)
         except Exception as e:
             print(f"Error ensuring collection: {e}")
             raise
 
     def _get_embedding_dimension(self) -> int:
         """Get the dimension of the embedding model."""
+        if self.local_embedder is not None:
+            if self._local_dimension is None:
+                self._local_dimension = len(next(iter(self.local_embedder.embed(["dimension"]))))
+            return self._local_dimension
+        if self._embedding_dimensions():
+            return Config.EMBEDDING_DIM
         model = Config.EMBEDDING_MODEL
         if "3-small" in model or "ada-002" in model:
             return 1536
@@ -87,21 +234,169 @@ class VectorStore:
             return 3072
         return 1536
 
-    def _create_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def _embedding_dimensions(self) -> Optional[int]:
+        """Requested embedding size, only text-embedding-3 models can shorten vectors."""
+        if self.local_embedder is None and Config.EMBEDDING_DIM and "text-embedding-3" in Config.EMBEDDING_MODEL:
+            return Config.EMBEDDING_DIM
+        return None
+
+    def _create_embeddings(self, texts: List[str]) -> "np.ndarray":
         """
         Create embeddings for a list of texts.
 
+        Vectors already in the on-disk cache are reused, only the misses
+        are sent to OpenAI.
+
         Args:
             texts: List of text strings
 
         Returns:
-            List of embedding vectors
+            Float32 array with one embedding per row
         """
-        response = self.openai_client.embeddings.create(
-            model=Config.EMBEDDING_MODEL,
-            input=texts
-        )
-        return [item.embedding for item in response.data]
+        if self._emb_cache is None:
+            return self._embed_uncached(texts)
+
+        model_id = self._model_id()
+        keys = [hashlib.sha256(f"{model_id}:{text}".encode("utf-8")).digest() for text in texts]
+        embeddings = np.empty((len(texts), self._get_embedding_dimension()), dtype=np.float32)
+        missing = []
+        for i, key in enumerate(keys):
+            data = self._emb_cache.get(key)
+            if data is None:
+                missing.append(i)
+            else:
+                embeddings[i] = np.frombuffer(data, dtype=np.float32)
+
+        signatures = {}
+        if missing and self._lsh is not None:
+            # Reuse the vector of a near-identical text (e.g. a whitespace or typo edit)
+            still_missing = []
+            for i in missing:
+                signatures[i] = self._minhash(texts[i])
+                with self._lsh_lock:
+                    matches = self._lsh.query(signatures[i])
+                for match in matches:
+                    # LSH only returns probable matches, check the similarity itself
+                    stored = self._signatures.get(match)
+                    if stored is None or signatures[i].jaccard(self._signature(stored)) < self.FUZZY_THRESHOLD:
+                        continue
+                    data = self._emb_cache.get(bytes.fromhex(match))
+                    if data is not None:
+                        embeddings[i] = np.frombuffer(data, dtype=np.float32)
+                        break
+                else:
+                    still_missing.append(i)
+            missing = still_missing
+
+        if missing:
+            fresh = self._embed_uncached([texts[i] for i in missing])
+            embeddings[missing] = fresh
+            for i, embedding in zip(missing, fresh):
+                self._emb_cache[keys[i]] = embedding.tobytes()
+            if self._lsh is not None:
+                # Signatures are stored one by one, the index itself is never pickled
+                with self._lsh_lock:
+                    for i in missing:
+                        if keys[i].hex() not in self._lsh:
+                            self._lsh.insert(keys[i].hex(), signatures[i])
+                            self._signatures[keys[i].hex()] = signatures[i].hashvalues.tobytes()
+
+        return embeddings
+
+    def _model_id(self) -> str:
+        """Embedding model and vector size, scoping every cached vector."""
+        return f"{Config.QUERY_EMBEDDER or Config.EMBEDDING_MODEL}:{self._embedding_dimensions()}"
+
+    def _load_lsh(self):
+        """Open the stored MinHash signatures of the current model and index them once per process."""
+        model_id = self._model_id()
+        self._signatures = diskcache.Cache(os.path.join(
+            Config.EMBEDDING_CACHE_DIR, "minhash", hashlib.sha256(model_id.encode("utf-8")).hexdigest()[:16]
+        ))
+        with self._lsh_lock:
+            if model_id not in self._lsh_indexes:
+                lsh = MinHashLSH(threshold=self.FUZZY_THRESHOLD, num_perm=128)
+                for key in self._signatures:
+                    lsh.insert(key, self._signature(self._signatures[key]))
+                self._lsh_indexes[model_id] = lsh
+                # Drop the single pickled index written by earlier versions
+                self._emb_cache.pop("minhash_lsh", None)
+            self._lsh = self._lsh_indexes[model_id]
+
+    @staticmethod
+    def _signature(data: bytes) -> "MinHash":
+        """Rebuild a stored MinHash signature."""
+        return MinHash(num_perm=128, hashvalues=np.frombuffer(data, dtype=np.uint64))
+
+    @staticmethod
+    def _minhash(text: str) -> "MinHash":
+        """MinHash signature over the character 5-shingles of a text."""
+        signature = MinHash(num_perm=128)
+        signature.update_batch([text[i:i + 5].encode("utf-8") for i in range(max(1, len(text) - 4))])
+        return signature
+
+    def _embed_query(self, query: str) -> tuple:
+        """Embed a search query, memoized in memory in front of the disk cache."""
+        key = (self._model_id(), query)
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(key)
+            if embedding is not None:
+                self._query_cache.move_to_end(key)
+                return embedding
+
+        embedding = tuple(self._embed_queries([query])[0].tolist())
+        with self._query_cache_lock:
+            self._query_cache[key] = embedding
+            while len(self._query_cache) > Config.EMBEDDING_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return embedding
+
+    def _embed_queries(self, queries: List[str]) -> "np.ndarray":
+        """Embed search queries, locally when a query embedder is configured."""
+        if self.local_embedder is not None:
+            # Computed in-process, faster than a disk cache lookup would save
+            return np.asarray(list(self.local_embedder.query_embed(queries)), dtype=np.float32)
+        return self._create_embeddings(queries)
+
+    def _embed_uncached(self, texts: List[str]) -> "np.ndarray":
+        """Create embeddings through the OpenAI API, or the local model when configured."""
+        if self.local_embedder is not None:
+            return np.asarray(list(self.local_embedder.embed(texts)), dtype=np.float32)
+
+        # One preallocated buffer, each sub-batch fills its own rows
+        embeddings = np.empty((len(texts), self._get_embedding_dimension()), dtype=np.float32)
+
+        # Stay under the per-request input and token limits and send sub-batches concurrently
+        ranges = batch_ranges(texts)
+        if len(ranges) <= 1:
+            self._embed_batch(texts, embeddings)
+            return embeddings
+
+        with ThreadPoolExecutor(max_workers=Config.EMBED_WORKERS) as executor:
+            list(executor.map(
+                lambda bounds: self._embed_batch(texts[bounds[0]:bounds[1]], embeddings[bounds[0]:bounds[1]]),
+                ranges
+            ))
+        return embeddings
+
+    def _embed_batch(self, texts: List[str], out: "np.ndarray"):
+        """
+        Create embeddings for one batch in a single API call.
+
+        Vectors are requested base64-encoded and decoded straight into the
+        rows of the output buffer, without building a Python float per value.
+
+        Args:
+            texts: Texts to embed
+            out: Float32 rows to fill, one per text
+        """
+        params = {"model": Config.EMBEDDING_MODEL, "input": texts, "encoding_format": "base64"}
+        dimensions = self._embedding_dimensions()
+        if dimensions:
+            params["dimensions"] = dimensions
+        response = self.openai_client.embeddings.create(**params)
+        for item in response.data:
+            out[item.index] = np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32)
 
     def add_documents(self, texts: List[str], metadatas: List[Dict]) -> int:
         """
@@ -117,84 +412,227 @@ class VectorStore:
         if not texts:
             return 0
 
-        # Create embeddings
-        print(f"Creating embeddings for {len(texts)} chunks...")
-        embeddings = self._create_embeddings(texts)
+        # Random UUID ids need no point-count round-trip and never collide
+        # between concurrent ingestions
+        ids = [str(uuid.uuid4()) for _ in texts]
 
-        # Get current offset
-        try:
-            collection_info = self.client.get_collection(self.collection_name)
-            offset = collection_info.points_count if collection_info.points_count else 0
-        except:
-            offset = 0
-
-        # Create points
-        points = [
-            PointStruct(
-                id=offset + i,
-                vector=embedding,
-                payload={**metadatas[i], "text": texts[i]}
-            )
-            for i, embedding in enumerate(embeddings)
+        # Same payload layout as the REST store, so either can read the collection;
+        # full texts live in the local store, the payload only keeps a preview
+        payloads = [
+            {"meta": meta, "preview": text[:Config.PREVIEW_CHARS]}
+            for text, meta in zip(texts, metadatas)
         ]
 
-        # Upload points
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=points
-        )
+        # Embed batches concurrently and upload each one as soon as its vectors
+        # arrive, so OpenAI and Qdrant requests overlap instead of running in turn.
+        # Each batch fits a single embedding request, so no pool nests inside another.
+        print(f"Creating embeddings for {len(texts)} chunks...")
+        with ThreadPoolExecutor(max_workers=Config.EMBED_WORKERS) as embedder, \
+                ThreadPoolExecutor(max_workers=Config.INGEST_WORKERS) as uploader:
+            pending = {
+                embedder.submit(self._create_embeddings, texts[start:end]): (start, end)
+                for start, end in batch_ranges(texts)
+            }
+            uploads = []
+            last = None
+            for future in as_completed(pending):
+                start, end = pending[future]
+                # Columnar batches slice the id, vector and payload lists directly,
+                # without building a PointStruct per point
+                batch = Batch(
+                    ids=ids[start:end],
+                    vectors=future.result().tolist(),
+                    payloads=payloads[start:end]
+                )
+                # Uploads don't wait for indexing, except the last one below
+                if last is not None:
+                    uploads.append(uploader.submit(
+                        self._call, self.client.upsert, collection_name=self.collection_name, points=last, wait=False
+                    ))
+                last = batch
+            for upload in uploads:
+                upload.result()
+
+        # Qdrant applies updates in order, so every batch is visible once this one is
+        self._call(self.client.upsert, collection_name=self.collection_name, points=last, wait=True)
+
+        # Texts are stored only once every upload succeeded, failed runs leave no orphan rows
+        with self._texts_lock, self._texts:
+            self._texts.executemany(
+                "INSERT OR REPLACE INTO texts (collection, id, text) VALUES (?, ?, ?)",
+                [(self.collection_name, point_id, text) for point_id, text in zip(ids, texts)]
+            )
 
-        print(f"Added {len(points)} documents to collection")
-        return len(points)
+        print(f"Added {len(ids)} documents to collection")
+        return len(ids)
 
-    def search(self, query: str, limit: int = 5) -> List[Dict]:
+    def search(self, query: str, limit: int = 5, filters: Optional[Dict] = None) -> List[Dict]:
         """
         Search for similar documents.
 
         Args:
             query: Search query
             limit: Maximum number of results
+            filters: Metadata fields mapped to the exact values results must have
 
         Returns:
             List of matching documents with scores
         """
         # Create query embedding
-        query_embedding = self._create_embeddings([query])[0]
+        query_embedding = list(self._embed_query(query))
+        query_filter = None
+        if filters:
+            query_filter = Filter(must=[
+                FieldCondition(key=f"meta.{key}", match=MatchValue(value=value)) for key, value in filters.items()
+            ])
+
+        # The threshold is applied here, so a pass that filled its limit with
+        # weak matches can be told apart from one that ran out of points
+        ef = max(Config.HNSW_EF_SEARCH, limit)
+        hits = self._query(query_embedding, query_filter, limit, ef)
+        passing = self._count_passing(hits)
+
+        # Widen the beam only when the graph may have missed closer points: the
+        # pass was full, too few hits are good enough, and the collection is large
+        # enough for Qdrant to walk the graph instead of scanning every point
+        if len(hits) == limit and passing < limit and self._points_count() >= Config.HNSW_RETRY_MIN_POINTS:
+            for _ in range(Config.HNSW_EF_RETRIES):
+                if ef >= Config.HNSW_EF_MAX:
+                    break
+                ef = min(ef * 2, Config.HNSW_EF_MAX)
+                wider = self._query(query_embedding, query_filter, limit, ef)
+                wider_passing = self._count_passing(wider)
+                if wider_passing <= passing:
+                    break
+                hits, passing = wider, wider_passing
+                if passing >= limit:
+                    break
+        return self._format_hits([hit for hit in hits if hit.score >= self.SCORE_THRESHOLD])
+
+    def _count_passing(self, hits) -> int:
+        """Number of hits at or above the score threshold."""
+        return sum(hit.score >= self.SCORE_THRESHOLD for hit in hits)
+
+    def _points_count(self) -> int:
+        """Approximate collection size, refreshed every few minutes."""
+        count, checked = self._point_counts.get(self.collection_name, (0, 0.0))
+        if time.monotonic() - checked > 300:
+            count = self._call(self.client.count, collection_name=self.collection_name, exact=False).count
+            self._point_counts[self.collection_name] = (count, time.monotonic())
+        return count
+
+    def _query(self, query_embedding: List[float], query_filter, limit: int, hnsw_ef: int) -> List:
+        """
+        Run one nearest-neighbour query.
+
+        Args:
+            query_embedding: Query vector
+            query_filter: Optional payload filter
+            limit: Maximum number of results
+            hnsw_ef: Search beam width
 
+        Returns:
+            Scored points, best first
+        """
         # Use query_points for newer Qdrant client
         try:
-            results = self.client.query_points(
+            return self._call(
+                self.client.query_points,
                 collection_name=self.collection_name,
                 query=query_embedding,
+                query_filter=query_filter,
                 limit=limit,
-                score_threshold=0.5
-            )
-
-            return [
-                {
-                    "text": hit.payload.get("text", "") if hit.payload else "",
-                    "metadata": {k: v for k, v in (hit.payload or {}).items() if k != "text"},
-                    "score": hit.score
-                }
-                for hit in results.points
-            ]
+                search_params=self._search_params(hnsw_ef)
+            ).points
         except AttributeError:
             # Fallback to older API
-            results = self.client.search(
+            return self._call(
+                self.client.search,
                 collection_name=self.collection_name,
                 query_vector=query_embedding,
+                query_filter=query_filter,
                 limit=limit,
-                score_threshold=0.5
+                search_params=self._search_params(hnsw_ef)
             )
 
-            return [
-                {
-                    "text": hit.payload.get("text", ""),
-                    "metadata": {k: v for k, v in hit.payload.items() if k != "text"},
-                    "score": hit.score
-                }
-                for hit in results
+    def search_batch(self, queries: List[str], limit: int = 5) -> List[List[Dict]]:
+        """
+        Search several queries with one embedding call and one Qdrant request.
+
+        Args:
+            queries: Search queries
+            limit: Maximum number of results per query
+
+        Returns:
+            List of result lists, in query order
+        """
+        if not queries:
+            return []
+
+        query_embeddings = self._embed_queries(queries)
+        params = self._search_params()
+        responses = self._call(
+            self.client.query_batch_points,
+            collection_name=self.collection_name,
+            requests=[
+                QueryRequest(query=embedding.tolist(), limit=limit, score_threshold=self.SCORE_THRESHOLD, with_payload=True, params=params)
+                for embedding in query_embeddings
             ]
+        )
+        return [self._format_hits(response.points) for response in responses]
+
+    def _quantization_config(self):
+        """Quantized vector copy kept in RAM for search, None to disable."""
+        mode = Config.quantization()
+        if mode == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if mode == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def _search_params(self, hnsw_ef: Optional[int] = None) -> "SearchParams":
+        """Search-time HNSW settings, rescoring quantized candidates with the original vectors."""
+        quantization = None
+        if self._quantization_config():
+            quantization = QuantizationSearchParams(
+                rescore=True,
+                oversampling=Config.quantization_oversampling()
+            )
+        return SearchParams(hnsw_ef=hnsw_ef or Config.HNSW_EF_SEARCH, exact=False, quantization=quantization)
+
+    def _format_hits(self, hits) -> List[Dict]:
+        """Convert Qdrant scored points into search result dictionaries, loading their texts."""
+        texts = self._load_texts([hit.id for hit in hits if "text" not in (hit.payload or {})])
+        results = []
+        for hit in hits:
+            # Each response builds fresh payload dicts, so the text can be popped
+            # off in place and the rest kept as the metadata without copying it
+            payload = hit.payload or {}
+            # Points written by the REST store carry their text, others keep it in
+            # the local store, with the preview as a last resort
+            text = payload.pop("text", None)
+            preview = payload.pop("preview", "")
+            results.append({
+                "text": text if text is not None else texts.get(hit.id, preview),
+                # Points written before metadata moved under "meta" keep it flat
+                "metadata": payload.get("meta", payload),
+                "score": hit.score
+            })
+        return results
+
+    def _load_texts(self, point_ids: List) -> Dict:
+        """Fetch the texts of the given points in a single query."""
+        if not point_ids:
+            return {}
+        placeholders = ",".join("?" * len(point_ids))
+        with self._texts_lock:
+            rows = self._texts.execute(
+                f"SELECT id, text FROM texts WHERE collection = ? AND id IN ({placeholders})",
+                [self.collection_name, *point_ids]
+            ).fetchall()
+        return dict(rows)
 
     def get_collection_info(self) -> Dict:
         """Get information about the collection."""
@@ -208,5 +646,8 @@ class VectorStore:
     def clear_collection(self):
         """Delete all documents from the collection."""
         self.client.delete_collection(self.collection_name)
-        self._ensure_collection()
+        self._bootstrapped.discard(self.collection_name)
+        with self._texts_lock, self._texts:
+            self._texts.execute("DELETE FROM texts WHERE collection = ?", (self.collection_name,))
+        self._ensure_collection(self.indexed_fields)
         print(f"Cleared collection: {self.collection_name}")